@@ -0,0 +1,72 @@
+"""Measures webhook ingest cost per update, from raw body to Update object.
+
+Usage: python -m benchmarks.ingest_bench [--updates 20000]
+"""
+import argparse
+import json
+import random
+import time
+
+from telegram import Bot, Update
+
+from utils import ingest
+
+COMMANDS = frozenset({"start", "register", "mydata", "event_join", "event_leave", "event_list"})
+
+
+def sample_updates(count, seed=0):
+    """Builds a realistic mix of group traffic: mostly chatter, some commands and button presses."""
+    rng = random.Random(seed)
+    chat = {"id": -1001234567890, "type": "supergroup", "title": "Volleyball"}
+    bodies = []
+    for update_id in range(count):
+        user = {"id": rng.randrange(10**8, 10**9), "is_bot": False, "first_name": "Player", "username": "player"}
+        roll = rng.random()
+        if roll < 0.7:
+            payload = {"message": {"message_id": update_id, "date": 1700000000, "chat": chat, "from": user,
+                                   "text": "see you on tuesday! " * rng.randrange(1, 6)}}
+        elif roll < 0.9:
+            payload = {"message": {"message_id": update_id, "date": 1700000000, "chat": chat, "from": user,
+                                   "text": rng.choice(["/event_join 42", "/event_list", "/register@volleybot"]),
+                                   "entities": [{"type": "bot_command", "offset": 0, "length": 11}]}}
+        else:
+            payload = {"callback_query": {"id": str(update_id), "from": user, "chat_instance": "1", "data": "17",
+                                          "message": {"message_id": 1, "date": 1700000000, "chat": chat, "text": "Q"}}}
+        payload["update_id"] = update_id
+        bodies.append(json.dumps(payload).encode())
+    return bodies
+
+
+def legacy_ingest(body, bot):
+    return Update.de_json(json.loads(body.decode("utf-8")), bot)
+
+
+def lean_ingest(body, bot):
+    data = ingest.loads(body)
+    if not ingest.wants_update(data, COMMANDS):
+        return None
+    return Update.de_json(data, bot)
+
+
+def measure(fn, bodies, bot):
+    began = time.perf_counter()
+    for body in bodies:
+        fn(body, bot)
+    return (time.perf_counter() - began) * 1e6 / len(bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=20_000)
+    args = parser.parse_args()
+
+    bot = Bot("123456:benchmark-token")
+    bodies = sample_updates(args.updates)
+    kept = sum(lean_ingest(body, bot) is not None for body in bodies)
+    print(f"JSON parser: {'orjson' if ingest.orjson else 'json'}; {kept}/{len(bodies)} updates reach handlers")
+    for name, fn in (("legacy", legacy_ingest), ("lean", lean_ingest)):
+        print(f"{name:>7}: {measure(fn, bodies, bot):.2f} us/update")
+
+
+if __name__ == "__main__":
+    main()
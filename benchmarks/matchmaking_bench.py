@@ -0,0 +1,63 @@
+"""Runs the multi-court matchmaking solver on synthetic rosters.
+
+Usage: python -m benchmarks.matchmaking_bench [--players 300] [--courts 25] [--seed 0]
+"""
+import argparse
+import random
+import time
+
+from utils.matchmaking import Court, MatchPlayer, solve
+
+POSITIONS = ["setter", "outside", "outside", "middle", "middle", "opposite", "libero", None]
+
+
+def synthetic_roster(players, courts, seed):
+    """Players with survey-like skill scores, positions and one or two preferred courts."""
+    rng = random.Random(seed)
+    court_list = [Court(id=number, capacity=12) for number in range(1, courts + 1)]
+    roster = []
+    for player_id in range(1, players + 1):
+        wanted = rng.sample(range(1, courts + 1), k=rng.choice((1, 1, 2))) if rng.random() < 0.8 else []
+        roster.append(MatchPlayer(
+            id=player_id,
+            skill=max(0, round(rng.gauss(30, 10))),
+            position=rng.choice(POSITIONS),
+            courts=frozenset(wanted),
+        ))
+    return roster, court_list
+
+
+def summarize(result, roster):
+    by_id = {player.id: player for player in roster}
+    gaps = []
+    unmet = 0
+    for court_id, teams in result.teams.items():
+        sums = [sum(by_id[player_id].skill for player_id in team) for team in teams]
+        gaps.append(abs(sums[0] - sums[1]))
+        for team in teams:
+            unmet += sum(1 for player_id in team if by_id[player_id].courts and court_id not in by_id[player_id].courts)
+    return max(gaps), sum(gaps) / len(gaps), unmet
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=300)
+    parser.add_argument("--courts", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    roster, courts = synthetic_roster(args.players, args.courts, args.seed)
+    began = time.perf_counter()
+    result = solve(roster, courts)
+    elapsed = time.perf_counter() - began
+
+    worst, mean, unmet = summarize(result, roster)
+    seated = args.players - len(result.waitlist)
+    print(f"{args.players} players on {args.courts} courts solved in {elapsed * 1000:.0f} ms")
+    print(f"seated {seated}, waitlisted {len(result.waitlist)}, total cost {result.cost:.1f}")
+    print(f"team skill gap per court: max {worst}, mean {mean:.2f}")
+    print(f"players away from their chosen court: {unmet}")
+
+
+if __name__ == "__main__":
+    main()
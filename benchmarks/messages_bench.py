@@ -0,0 +1,117 @@
+"""Measures the cost of rendering reply texts, per message type.
+
+Usage: python -m benchmarks.messages_bench [--renders 100000]
+
+Compares the compiled catalog with formatting the raw JSON templates on
+every reply and with the inline f-strings the handlers used before the
+catalog existed.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from handlers import _question_keyboard
+from utils.messages import MESSAGES_DIR, PLURAL_RULES, load_catalog
+from utils.roster import render_roster
+from utils.survey import SurveyOption, SurveyQuestion
+
+GAME_DATE = datetime(2024, 5, 17, 19, 0)
+
+
+def raw_templates():
+    templates = {}
+    for lang in ("en", "ru"):
+        with open(os.path.join(MESSAGES_DIR, f"{lang}.json"), encoding="utf-8") as f:
+            templates[lang] = json.load(f)
+    return templates
+
+
+def raw_render(templates, lang, key, **values):
+    """Looks the template up and formats it from scratch, as an uncompiled catalog would."""
+    template = templates[lang].get(key) or templates["en"][key]
+    if isinstance(template, dict):
+        template = template[PLURAL_RULES[lang][1](values["count"])]
+    return template.format(**values)
+
+
+def measure(fn, renders):
+    began = time.perf_counter()
+    for _ in range(renders):
+        fn()
+    return (time.perf_counter() - began) * 1e9 / renders
+
+
+def message_types(catalog, templates):
+    """(name, inline f-string, raw template, compiled catalog) for each kind of reply."""
+    name, series_id, count = "Thursdays", 7, 4
+    return [
+        (
+            "static (welcome)",
+            lambda: "Welcome to the Volleyball Bot!\n" "Type /register to join our community!",
+            lambda: raw_render(templates, "ru", "start.welcome"),
+            lambda: catalog.render("ru", "start.welcome"),
+        ),
+        (
+            "one field (event created)",
+            lambda: f"Event '{name}' created successfully.",
+            lambda: raw_render(templates, "ru", "event_create.done", name=name),
+            lambda: catalog.render("ru", "event_create.done", name=name),
+        ),
+        (
+            "plural (series created)",
+            lambda: f"Series '{name}' created with ID {series_id}; {count} upcoming game(s) scheduled. "
+            f"Use /series_join {series_id} to play every week.",
+            lambda: raw_render(templates, "ru", "series_create.done", name=name, series_id=series_id, count=count),
+            lambda: catalog.render("ru", "series_create.done", name=name, series_id=series_id, count=count),
+        ),
+        (
+            "date (event list line)",
+            lambda: f"{series_id}. {name} ({GAME_DATE:%Y-%m-%d %H:%M}), up to 12 players",
+            lambda: raw_render(templates, "ru", "event_list.item_dated", id=series_id, name=name, date=GAME_DATE, limit=12),
+            lambda: catalog.render("ru", "event_list.item_dated", id=series_id, name=name, date=GAME_DATE, limit=12),
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=100_000)
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    catalog = load_catalog()
+    print(f"Catalog load and compile: {(time.perf_counter() - began) * 1e3:.2f} ms "
+          f"({len(catalog.messages[catalog.default])} messages, {len(catalog.messages)} languages)")
+
+    templates = raw_templates()
+    print(f"{'message':>28} {'f-string':>10} {'raw':>10} {'compiled':>10}  (ns/render)")
+    for label, inline, raw, compiled in message_types(catalog, templates):
+        timings = [measure(fn, args.renders) for fn in (inline, raw, compiled)]
+        print(f"{label:>28} " + " ".join(f"{timing:10.0f}" for timing in timings))
+
+    event = SimpleNamespace(name="Friday", date=GAME_DATE, max_participants=12)
+    players = [(f"Player {number}", f"player{number}") for number in range(12)]
+    print(f"{'roster, 12 players':>28} {measure(lambda: render_roster(event, players), args.renders // 10):10.0f} ns")
+
+    question = SurveyQuestion(
+        id=1, text="Position?", weight=1,
+        options=tuple(SurveyOption(id=number, text=f"Option {number}", points=number) for number in range(1, 6)),
+    )
+
+    def build_keyboard():
+        return InlineKeyboardMarkup(
+            [[InlineKeyboardButton(option.text, callback_data=str(option.id))] for option in question.options]
+        )
+
+    renders = args.renders // 10
+    print(f"{'survey keyboard, built':>28} {measure(build_keyboard, renders):10.0f} ns")
+    print(f"{'survey keyboard, cached':>28} {measure(lambda: _question_keyboard(question), renders):10.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
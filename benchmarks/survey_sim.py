@@ -0,0 +1,111 @@
+"""Simulates registrations to compare the adaptive survey against the full one.
+
+Each synthetic player has a hidden level in 0..1 and answers every question
+near that level with some noise. The full survey score is the reference
+rating; the adaptive survey is judged on how many questions it needs and
+how far its estimated rating lands from the reference.
+
+Usage: python -m benchmarks.survey_sim [--players 5000] [--noise 0.15] [--tolerance 0.05]
+"""
+import argparse
+import json
+import random
+
+from utils.survey import bank_from_json, full_score, next_question, rating
+
+
+def simulated_answer(question, level, noise, rng):
+    """Chooses the option whose points are closest to the player's noisy level."""
+    points = [option.points for option in question.options]
+    low, high = min(points), max(points)
+    target = low + min(1.0, max(0.0, rng.gauss(level, noise))) * (high - low)
+    return min(question.options, key=lambda option: abs(option.points - target)).id
+
+
+def run_survey(bank, level, noise, rng, adaptive, tolerance):
+    answers = {}
+    while True:
+        question = next_question(bank, answers, adaptive=adaptive, tolerance=tolerance)
+        if question is None:
+            return answers
+        answers[question.id] = simulated_answer(question, level, noise, rng)
+
+
+def ranks(values):
+    order = sorted(range(len(values)), key=values.__getitem__)
+    result = [0] * len(values)
+    for rank, index in enumerate(order):
+        result[index] = rank
+    return result
+
+
+def spearman(a, b):
+    ra, rb = ranks(a), ranks(b)
+    n = len(a)
+    return 1 - 6 * sum((x - y) ** 2 for x, y in zip(ra, rb)) / (n * (n ** 2 - 1))
+
+
+def simulate(bank, players=5000, noise=0.15, seed=0, tolerance=None):
+    """Runs both survey modes over the same synthetic players and compares their ratings."""
+    tolerance_kwargs = {} if tolerance is None else {"tolerance": tolerance}
+    rng = random.Random(seed)
+    asked = []
+    errors = []
+    levels = []
+    reference = []
+    estimated = []
+    for _ in range(players):
+        level = rng.random()
+        levels.append(level)
+        answer_seed = rng.random()
+        # Both modes see the same answers for the questions they share
+        full = run_survey(bank, level, noise, random.Random(answer_seed), adaptive=False, tolerance=0)
+        adaptive = {}
+        while True:
+            question = next_question(bank, adaptive, **tolerance_kwargs)
+            if question is None:
+                break
+            adaptive[question.id] = full[question.id]
+        asked.append(len(adaptive))
+        reference.append(full_score(bank, full))
+        estimated.append(rating(bank, adaptive))
+        errors.append(abs(estimated[-1] - reference[-1]))
+
+    return {
+        "mean_questions": sum(asked) / len(asked),
+        "max_questions": max(asked),
+        "mean_error": sum(errors) / len(errors),
+        "max_error": max(errors),
+        "rank_vs_full": spearman(reference, estimated),
+        "full_rank_vs_level": spearman(levels, reference),
+        "adaptive_rank_vs_level": spearman(levels, estimated),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=5000)
+    parser.add_argument("--noise", type=float, default=0.15)
+    parser.add_argument("--tolerance", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--questions", default="data/initial_data.json")
+    args = parser.parse_args()
+
+    with open(args.questions) as f:
+        bank = bank_from_json(json.load(f))
+    result = simulate(bank, args.players, args.noise, args.seed, args.tolerance)
+
+    # Every question costs one message out and one callback in, plus the closing message
+    full_calls = 2 * len(bank) + 1
+    adaptive_calls = 2 * result["mean_questions"] + 1
+    print(f"questions: full {len(bank)}, adaptive mean {result['mean_questions']:.2f} (max {result['max_questions']})")
+    print(f"messages + handler calls per registration: full {full_calls}, adaptive {adaptive_calls:.2f}")
+    print(f"rating error vs full survey: mean {result['mean_error']:.2f} points"
+          f" ({100 * result['mean_error'] / bank.total_range:.1f}% of range), max {result['max_error']}")
+    print(f"rank correlation with full survey: {result['rank_vs_full']:.3f}")
+    print(f"rank correlation with hidden level: full {result['full_rank_vs_level']:.3f},"
+          f" adaptive {result['adaptive_rank_vs_level']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
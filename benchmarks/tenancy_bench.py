@@ -0,0 +1,101 @@
+"""Measures per-group event queries on a database shared by many groups.
+
+Usage: python -m benchmarks.tenancy_bench [--groups 100] [--events 10000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from models import Base, Event
+from utils.db import create_db_engine, create_db_session
+
+BATCH_SIZE = 50_000
+
+
+def populate(session, groups, events_per_group, busy_factor):
+    """Bulk inserts events; the first group is `busy_factor` times larger than the rest."""
+    start = datetime(2024, 1, 1)
+    rows = []
+    for group in range(groups):
+        chat_id = -1_000_000_000 - group
+        count = events_per_group * (busy_factor if group == 0 else 1)
+        for n in range(count):
+            rows.append({
+                "chat_id": chat_id,
+                "name": f"Game {n}",
+                "date": start + timedelta(hours=n),
+                "max_participants": 12,
+                # Only the most recent handful of events are still open
+                "is_active": n >= count - 5,
+            })
+            if len(rows) >= BATCH_SIZE:
+                session.execute(insert(Event), rows)
+                rows.clear()
+    if rows:
+        session.execute(insert(Event), rows)
+    session.commit()
+
+
+def time_queries(session, chat_ids, repeat):
+    """Returns the mean latency in milliseconds of the handler queries for the given chats."""
+    timings = {"event_list": 0.0, "event_join lookup": 0.0}
+    for _ in range(repeat):
+        for chat_id in chat_ids:
+            began = time.perf_counter()
+            events = (
+                session.query(Event.id, Event.name, Event.date, Event.max_participants)
+                .filter_by(chat_id=chat_id, is_active=True)
+                .order_by(Event.date)
+                .all()
+            )
+            timings["event_list"] += time.perf_counter() - began
+
+            began = time.perf_counter()
+            session.query(Event).filter_by(id=events[0].id, chat_id=chat_id).first()
+            timings["event_join lookup"] += time.perf_counter() - began
+    calls = repeat * len(chat_ids)
+    return {name: total * 1000 / calls for name, total in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--events", type=int, default=10_000, help="events per group")
+    parser.add_argument("--busy-factor", type=int, default=10, help="size multiplier of the busiest group")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine({"database": {"dialect": "sqlite", "name": os.path.join(tmp, "bench.db")}})
+        Base.metadata.create_all(engine)
+        session = create_db_session(engine)()
+
+        began = time.perf_counter()
+        populate(session, args.groups, args.events, args.busy_factor)
+        total = session.query(Event).count()
+        print(f"Inserted {total} events for {args.groups} groups in {time.perf_counter() - began:.1f}s")
+
+        plan = session.execute(
+            text("EXPLAIN QUERY PLAN SELECT id FROM events WHERE chat_id = :c AND is_active = 1 ORDER BY date"),
+            {"c": -1_000_000_000},
+        ).all()
+        print("event_list plan:", "; ".join(row[-1] for row in plan))
+
+        rng = random.Random(0)
+        quiet = [-1_000_000_000 - rng.randrange(1, args.groups) for _ in range(10)] if args.groups > 1 else []
+        for label, chat_ids in (("busy group", [-1_000_000_000]), ("quiet groups", quiet)):
+            if not chat_ids:
+                continue
+            for name, ms in time_queries(session, chat_ids, args.repeat).items():
+                print(f"{label:>12} {name:<18} {ms:.3f} ms")
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,19 @@ import json
 from fastapi import FastAPI, Request, Depends, HTTPException
 from fastapi.responses import HTMLResponse, FileResponse
 from telegram import Update, Bot
-from telegram.ext import Application, ApplicationBuilder, CommandHandler, CallbackQueryHandler, CallbackContext
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, CallbackContext
 from dotenv import load_dotenv
 from utils.db import create_db_engine, create_db_session
+from utils.roster import RosterUpdater
+from utils.throttle import UpdateThrottle, DEFAULT_USER_LIMITS, DEFAULT_CHAT_LIMITS, classify_update
+from utils import ingest
+from utils.drain import DrainController
+from utils.profiling import UpdateProfiler
+from utils.scheduler import JobScheduler
+from utils.coordination import DatabaseCoordinator, LocalCoordinator
+from utils.messages import default_catalog
 import handlers  # Import the handler functions
-from startup import startup_event, shutdown_event
+from startup import build_application, startup_event, shutdown_event
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +30,20 @@ ADMIN_TELEGRAM_IDS = [
 ]
 MODE = os.environ.get("MODE", "webhook")  # Force webhook mode
 WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_SECRET_TOKEN = os.environ.get("WEBHOOK_SECRET_TOKEN")
+MAX_UPDATE_BYTES = int(os.environ.get("MAX_UPDATE_BYTES", ingest.DEFAULT_MAX_BODY_BYTES))
+PERSISTENCE_FILE = os.environ.get("PERSISTENCE_FILE")  # Keeps user_data/chat_data across restarts
+SHUTDOWN_DRAIN_SECONDS = float(os.environ.get("SHUTDOWN_DRAIN_SECONDS", "10"))
+ADMIN_API_TOKEN = os.environ.get("ADMIN_API_TOKEN")  # Required by the /admin endpoints
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# "inprocess" runs reminders from a timer in this process; "cron" relies on /cron/tick only
+SCHEDULER_MODE = os.environ.get("SCHEDULER_MODE", "inprocess")
+CRON_SECRET = os.environ.get("CRON_SECRET")
+# "database" shares locks, survey progress and cache invalidation between workers; "local" keeps them in memory
+COORDINATION = os.environ.get("COORDINATION", "database")
+# Per-command limits as "command=rate/burst,...", rate in updates per second
+THROTTLE_USER_LIMITS = os.environ.get("THROTTLE_USER_LIMITS", DEFAULT_USER_LIMITS)
+THROTTLE_CHAT_LIMITS = os.environ.get("THROTTLE_CHAT_LIMITS", DEFAULT_CHAT_LIMITS)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,6 +52,16 @@ logger = logging.getLogger(__name__)
 # Initialize FastAPI app
 app = FastAPI()
 
+# Inbound rate limiting, applied before updates reach the handlers
+throttle = UpdateThrottle(THROTTLE_USER_LIMITS, THROTTLE_CHAT_LIMITS)
+
+# In-flight request tracking for graceful shutdown
+drain = DrainController()
+
+# Reply templates are compiled once, here; a broken translation fails startup rather than a reply
+catalog = default_catalog()
+logger.info(f"Messages: {', '.join(sorted(catalog.messages))}, default {catalog.default}")
+
 # Initialize Telegram bot application
 bot_status = "Not Initialized"
 application = None  # Define application outside the if block
@@ -38,10 +70,8 @@ if not TELEGRAM_BOT_TOKEN:
     bot_status = "Error: TELEGRAM_BOT_TOKEN not found"
 else:
     try:
-        # Create a Bot instance
-        telegram_bot = Bot(TELEGRAM_BOT_TOKEN)
-        # Initialize the Application with the bot instance
-        application = ApplicationBuilder().bot(telegram_bot).build()
+        # Initialize the Application with a Bot instance
+        application = build_application(Bot(TELEGRAM_BOT_TOKEN), PERSISTENCE_FILE)
         bot_status = "Initialized"
     except Exception as e:
         logger.error(f"Failed to initialize Telegram bot: {e}")
@@ -50,6 +80,8 @@ else:
 
 # Database connection
 db_status = "Not Connected"
+engine = None
+Session = None
 try:
     config = {"database": {"dialect": "sqlite", "name": "volleybot.db"}}
     engine = create_db_engine(config=config)
@@ -59,28 +91,45 @@ except Exception as e:
     logger.error(f"Failed to connect to the database: {e}")
     db_status = f"Error: {e}"
 
-# Define a dependency to get a database session
-def get_db_session():
-    engine = create_db_engine(config=config)
-    Session = create_db_session(engine)
-    session = Session()
-    try:
-        yield session
-    finally:
-        session.close()
+# Opt-in update profiling, switched on with /profiling or POST /admin/profiling
+profiler = UpdateProfiler(engine, PROFILE_DIR)
 
 if application:
+    coordinator = DatabaseCoordinator(engine) if COORDINATION == "database" else LocalCoordinator()
+    application.bot_data["coordinator"] = coordinator
+    # Shared roster message editor, reached by handlers through context.bot_data
+    application.bot_data["roster_updater"] = RosterUpdater(application.bot, Session, coordinator)
+    application.bot_data["profiler"] = profiler
+    # /profiling and POST /admin/profiling reach every worker
+    profiler.share(coordinator)
+    application.bot_data["scheduler"] = JobScheduler(application.bot, Session, roster=application.bot_data["roster_updater"])
+    # Reloaded from the database on next use after POST /admin/invalidate/survey_bank
+    coordinator.subscribe("survey_bank", lambda: application.bot_data.pop("survey_bank", None))
+
     # Register Telegram handlers
     application.add_handler(CommandHandler("start", lambda update, context: handlers.start(update, context, engine, Session)))
     application.add_handler(CommandHandler("register", lambda update, context: handlers.register(update, context, engine, Session)))
     application.add_handler(CommandHandler("mydata", lambda update, context: handlers._show_my_data(update, context, engine, Session)))
-    application.add_handler(CommandHandler("edit_my_data", handlers.edit_my_data))
+    application.add_handler(CommandHandler("edit_my_data", lambda update, context: handlers.edit_my_data(update, context, engine, Session)))
     application.add_handler(CommandHandler("event_create", lambda update, context: handlers.event_create(update, context, engine, Session)))
     application.add_handler(CommandHandler("event_join", lambda update, context: handlers.event_join(update, context, engine, Session)))
+    application.add_handler(CommandHandler("event_leave", lambda update, context: handlers.event_leave(update, context, engine, Session)))
+    application.add_handler(CommandHandler("series_create", lambda update, context: handlers.series_create(update, context, engine, Session)))
+    application.add_handler(CommandHandler("series_join", lambda update, context: handlers.series_join(update, context, engine, Session)))
+    application.add_handler(CommandHandler("event_result", lambda update, context: handlers.event_result(update, context, engine, Session)))
+    application.add_handler(CommandHandler("stats", lambda update, context: handlers.stats_command(update, context, engine, Session)))
     application.add_handler(CommandHandler("event_list", lambda update, context: handlers.event_list(update, context, engine, Session)))
     application.add_handler(CommandHandler("balance_teams", lambda update, context: handlers.balance_teams_command(update, context, engine, Session)))
+    application.add_handler(CommandHandler("matchmake", lambda update, context: handlers.matchmake_command(update, context, engine, Session)))
+    application.add_handler(CommandHandler("profiling", lambda update, context: handlers.profiling_command(update, context, engine, Session)))
+    application.add_handler(CommandHandler("admin_add", lambda update, context: handlers.admin_add(update, context, engine, Session)))
     application.add_handler(CallbackQueryHandler(lambda update, context: handlers._process_callback_query(update, context, engine, Session)))
 
+# Commands the webhook lets through; anything else is dropped before parsing into objects
+handled_commands = ingest.registered_commands(application) if application else frozenset()
+# Known once the bot is initialized at startup; /command@otherbot is dropped from then on
+bot_username = None
+
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -101,24 +150,105 @@ async def read_root():
 
 
 @app.post("/webhook")
-async def webhook(request: Request, session: Session = Depends(get_db_session)):
+async def webhook(request: Request):
     """Handle webhook updates."""
+    # While draining, make Telegram retry the update against the next instance
+    if not drain.enter():
+        raise HTTPException(status_code=503, detail="Shutting down", headers={"Retry-After": "1"})
     try:
-        json_str = await request.body()
-        json_data = json.loads(json_str.decode("utf-8"))  # Parse JSON data
-        update = Update.de_json(json_data, application.bot)
+        return await _handle_webhook(request)
+    finally:
+        drain.exit()
 
-        # Pass the session to the handler
-        context = CallbackContext(application)  # Create a context
-        context.session = session
 
-        await application.process_update(update)
+async def _handle_webhook(request: Request):
+    # Reject forged requests before reading the body
+    if not ingest.secret_matches(request.headers.get("x-telegram-bot-api-secret-token"), WEBHOOK_SECRET_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+    try:
+        body = await ingest.read_body(request, MAX_UPDATE_BYTES)
+    except ingest.BodyTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    json_data = ingest.parse_update(body)
+    if json_data is None:
+        logger.warning(f"Webhook body is not a JSON object: {body[:200]!r}")
+        raise HTTPException(status_code=400, detail="Malformed update")
+
+    try:
+        # Acknowledge ignored and throttled updates so Telegram does not redeliver them
+        if not ingest.wants_update(json_data, handled_commands, bot_username):
+            return {"ok": True}
+        if not throttle.allow(json_data):
+            throttle.publish(application.bot_data["coordinator"])
+            return {"ok": True}
+        update = Update.de_json(json_data, application.bot)
+
+        label = f"{json_data.get('update_id')}-{classify_update(json_data)[0]}"
+        await profiler.run(application.process_update(update), label)
         return {"ok": True}
     except Exception as e:
         logger.error(f"Webhook error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _require_admin_token(request: Request):
+    token = request.headers.get("x-admin-token")
+    if not ADMIN_API_TOKEN or not ingest.secret_matches(token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.get("/throttle")
+async def throttle_stats(request: Request):
+    """Report dropped update counters of all workers."""
+    _require_admin_token(request)
+    coordinator = application.bot_data["coordinator"]
+    # This worker's latest drops are included right away; other workers publish every few seconds
+    throttle.publish(coordinator, interval=0)
+    return throttle.stats(coordinator)
+
+
+@app.post("/admin/profiling")
+async def configure_profiling(request: Request, enabled: bool = None, sample_rate: float = None, threshold: float = None):
+    """Turn update profiling on or off and adjust its sampling."""
+    _require_admin_token(request)
+    return profiler.configure(enabled=enabled, sample_rate=sample_rate, threshold=threshold)
+
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """List captured slow updates, newest first."""
+    _require_admin_token(request)
+    return {"settings": profiler.settings(), "captures": profiler.list()}
+
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str, request: Request):
+    """Fetch one slow update capture."""
+    _require_admin_token(request)
+    capture = profiler.load(name)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return capture
+
+
+@app.post("/admin/invalidate/{key}")
+async def invalidate_cache(key: str, request: Request):
+    """Make every worker drop its cached copy of `key`, e.g. survey_bank after editing questions."""
+    _require_admin_token(request)
+    application.bot_data["coordinator"].invalidate(key)
+    return {"invalidated": key}
+
+
+@app.get("/cron/tick")
+async def cron_tick(request: Request):
+    """Run due reminders and auto-close jobs; called by an external scheduler."""
+    expected = f"Bearer {CRON_SECRET}" if CRON_SECRET else None
+    if not expected or not ingest.secret_matches(request.headers.get("authorization"), expected):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return await application.bot_data["scheduler"].run_due()
+
+
 @app.get("/favicon.ico")
 async def favicon_ico():
     raise HTTPException(status_code=404, detail="Not Found")
@@ -132,13 +262,22 @@ async def favicon_png():
 @app.on_event("startup")
 async def startup_event_handler():
     """Set up the bot on startup."""
-    await startup_event(app, TELEGRAM_BOT_TOKEN, WEBHOOK_URL, application)
+    global bot_username
+    await startup_event(app, TELEGRAM_BOT_TOKEN, WEBHOOK_URL, application, WEBHOOK_SECRET_TOKEN)
+    bot_username = application.bot.username
+    # uvicorn waits for running requests before the shutdown event, so draining starts at its exit signal
+    drain.install_signal_handlers()
+    await application.bot_data["coordinator"].start()
+    # Picks up profiling switched on before this worker started
+    profiler.reload()
+    if SCHEDULER_MODE == "inprocess":
+        application.bot_data["scheduler"].start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event_handler():
     """Clean up resources on shutdown."""
-    await shutdown_event(app, application)
+    await shutdown_event(app, application, drain, SHUTDOWN_DRAIN_SECONDS)
 
 
 def start(update: Update, context: CallbackContext, engine, Session):
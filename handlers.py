@@ -1,20 +1,70 @@
+import contextlib
+import functools
 import logging
 import os
+from datetime import datetime
+from sqlalchemy import delete, func, insert, or_, update as sql_update
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CallbackContext
 
-from models import Player, Question, QuestionOption, Response, Event, EventParticipant
+from models import Player, Response, Event, EventParticipant, GroupMember, GroupAdmin, EventSeries, PlayerStats
+from utils.matchmaking import Court, MatchPlayer, solve
+from utils import messages, stats, survey
+from utils.scheduler import schedule_event_jobs, materialize_series
+from utils.series import parse_weekday, add_regular, upcoming_events
+from utils.coordination import LocalCoordinator, LockTimeout
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Used when the application does not provide a coordinator
+_local_coordinator = LocalCoordinator()
+
+
+def _global_admin_ids():
+    """Returns the Telegram IDs of admins allowed to manage every group."""
+    return {
+        int(admin_id)
+        for admin_id in os.environ.get("ADMIN_TELEGRAM_IDS", "").split(",")
+        if admin_id.strip()
+    }
+
+
+def _text(update: Update, key, **values):
+    """Renders a catalog message in the language of the user who sent the update."""
+    catalog = messages.default_catalog()
+    user = update.effective_user
+    return catalog.render(catalog.language(user.language_code if user else None), key, **values)
+
+
+def _is_admin(session, chat_id, telegram_id):
+    """Checks whether a user may run admin commands in the given chat."""
+    if telegram_id in _global_admin_ids():
+        return True
+    return (
+        session.query(GroupAdmin.id)
+        .filter_by(chat_id=chat_id, telegram_id=telegram_id)
+        .first()
+        is not None
+    )
+
+
+def _group_player(session, chat_id, telegram_id):
+    """Returns the player if they registered in this group chat; players of other groups are not found."""
+    return (
+        session.query(Player)
+        .join(GroupMember, GroupMember.player_id == Player.id)
+        .filter(Player.telegram_id == telegram_id, GroupMember.chat_id == chat_id)
+        .first()
+    )
+
 
 async def start(update: Update, context: CallbackContext, engine, Session):
     """Send a message when the command /start is issued."""
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
-        text="Welcome to the Volleyball Bot!\n" "Type /register to join our community!",
+        text=_text(update, "start.welcome"),
     )
 
 
@@ -28,68 +78,128 @@ async def register(update: Update, context: CallbackContext, engine, Session):
     player = session.query(Player).filter_by(telegram_id=telegram_id).first()
 
     if player:
+        # Registered players only need to be added to this group
+        membership = (
+            session.query(GroupMember.id)
+            .filter_by(chat_id=chat_id, player_id=player.id)
+            .first()
+        )
+        if membership:
+            session.close()
+            await context.bot.send_message(chat_id=chat_id, text=_text(update, "register.already"))
+            return
+        session.add(GroupMember(chat_id=chat_id, player_id=player.id))
+        session.commit()
         session.close()
-        await context.bot.send_message(chat_id=chat_id, text="You are already registered!")
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "register.joined_group"))
         return
 
     player = Player(telegram_id=telegram_id, telegram_handle=telegram_handle)
     session.add(player)
+    session.flush()
+    session.add(GroupMember(chat_id=chat_id, player_id=player.id))
     session.commit()
     session.close()
 
-    context.user_data["current_question"] = 1  # Start with the first question
-    await _ask_question(update, context, engine, Session)
+    await _ask_question(update, context, engine, Session, {})
 
 
-async def _ask_question(update: Update, context: CallbackContext, engine, Session):
-    """Asks a question from the survey."""
+def _survey_bank(context: CallbackContext, Session):
+    """Returns the survey questions, read from the database once per process."""
+    bank = context.bot_data.get("survey_bank")
+    if bank is None:
+        session = Session()
+        bank = context.bot_data["survey_bank"] = survey.load_bank(session)
+        session.close()
+    return bank
+
+
+def _coordinator(context: CallbackContext):
+    """Returns the coordinator shared by all workers, or a process-local one."""
+    return context.bot_data.get("coordinator") or _local_coordinator
+
+
+def _load_survey(context: CallbackContext, telegram_id):
+    """Returns the question being asked, the message asking it and the answers given so far."""
+    state = _coordinator(context).get_state(f"survey:{telegram_id}") or {}
+    # JSON object keys are strings
+    responses = {int(question_id): option_id for question_id, option_id in state.get("responses", {}).items()}
+    return state.get("current_question"), state.get("message_id"), responses
+
+
+def _store_survey(context: CallbackContext, telegram_id, current_question, message_id, responses):
+    """Keeps survey progress where every worker can see it, so any of them can take the next answer."""
+    _coordinator(context).set_state(
+        f"survey:{telegram_id}",
+        {"current_question": current_question, "message_id": message_id, "responses": responses},
+    )
+
+
+def _adaptive_survey():
+    """Adaptive mode asks fewer questions; SURVEY_MODE=full asks all of them in order."""
+    return os.environ.get("SURVEY_MODE", "adaptive") != "full"
+
+
+@functools.lru_cache(maxsize=256)
+def _question_keyboard(question):
+    """The answer buttons of a survey question, built once per question; the markup is immutable."""
+    return InlineKeyboardMarkup(
+        [[InlineKeyboardButton(option.text, callback_data=str(option.id))] for option in question.options]
+    )
+
+
+async def _ask_question(update: Update, context: CallbackContext, engine, Session, responses):
+    """Asks the next survey question, given the answers so far."""
     chat_id = update.effective_chat.id
-    question_id = context.user_data.get("current_question")
-    session = Session()
+    telegram_id = update.effective_user.id
+    bank = _survey_bank(context, Session)
 
-    question = session.query(Question).get(question_id)
+    question = survey.next_question(
+        bank,
+        responses,
+        adaptive=_adaptive_survey(),
+        tolerance=float(os.environ.get("SURVEY_TOLERANCE", survey.DEFAULT_TOLERANCE)),
+    )
     if not question:
-        session.close()
-        await _save_responses(update, context, engine, Session)
+        await _save_responses(update, context, engine, Session, responses)
         return
 
-    keyboard = [[InlineKeyboardButton(option.option_text, callback_data=str(option.id))] for option in question.options]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await context.bot.send_message(
-        chat_id=chat_id, text=question.question_text, reply_markup=reply_markup
+    message = await context.bot.send_message(
+        chat_id=chat_id, text=question.text, reply_markup=_question_keyboard(question)
     )
-    session.close()
+    _store_survey(context, telegram_id, question.id, message.message_id, responses)
 
 
-async def _save_responses(update: Update, context: CallbackContext, engine, Session):
+async def _save_responses(update: Update, context: CallbackContext, engine, Session, responses):
     """Saves the responses and calculates the player's power level."""
     chat_id = update.effective_chat.id
+    bank = _survey_bank(context, Session)
+
     session = Session()
     player = session.query(Player).filter_by(telegram_id=update.effective_user.id).first()
+    if not player:
+        session.close()
+        await context.bot.send_message(
+            chat_id=chat_id, text=_text(update, "common.not_registered")
+        )
+        return
 
-    # Calculate total score based on responses
-    total_score = 0
-    if "responses" in context.user_:
-        for response_id in context.user_data.get("responses", {}).values():
-            option = session.query(QuestionOption).get(option_id)
-            if option:
-                total_score += option.response_points
-
-    # Update player's skill_level (you might want a more sophisticated calculation)
-    player.skill_level = (
-        total_score  # Assuming you add a 'skill_level' column to the Player model
-    )
+    if responses:
+        # One executemany; the new ids are never read back
+        session.execute(insert(Response), [
+            {"player_id": player.id, "question_id": question_id, "option_id": option_id}
+            for question_id, option_id in responses.items()
+        ])
+    # Skipped questions are estimated from the answers given
+    player.skill_level = survey.rating(bank, responses)
 
     session.commit()
     session.close()
 
     await context.bot.send_message(
-        chat_id=chat_id, text="Thank you for completing the survey!"
+        chat_id=chat_id, text=_text(update, "survey.thanks")
     )
-    # Clean up user_data
-    context.user_data.pop("current_question", None)
-    context.user_data.pop("responses", None)
+    _coordinator(context).delete_state(f"survey:{update.effective_user.id}")
 
 
 async def _show_my_data(update: Update, context: CallbackContext, engine, Session):
@@ -101,64 +211,69 @@ async def _show_my_data(update: Update, context: CallbackContext, engine, Sessio
     if player:
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
-            text=f"Telegram Handle: {player.telegram_handle}\n",
+            text=_text(update, "mydata.summary", handle=player.telegram_handle),
         )
     else:
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
-            text="You haven't registered yet. Use /register to join!",
+            text=_text(update, "common.not_registered"),
         )
 
 
-def edit_my_data(update: Update, context: CallbackContext):
+async def edit_my_data(update: Update, context: CallbackContext, engine, Session):
     """Allows the user to edit their data."""
     # Implement the logic to allow the user to edit their data
     # This could involve asking questions and updating the database
-    context.bot.send_message(
-        chat_id=update.effective_chat.id, text="This feature is not yet implemented."
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id, text=_text(update, "edit_my_data.not_implemented")
     )
 
 
 async def _process_callback_query(update: Update, context: CallbackContext, engine, Session):
     """Processes the callback query from the inline keyboard."""
-    query = update.callback_query
-    query = update.callback_query
-    query.answer()
+    try:
+        await _record_answer(update, context, engine, Session)
+    except LockTimeout:
+        await update.callback_query.answer(_text(update, "common.busy"), show_alert=True)
 
-    option_id = int(query.data)
-    question_id = context.user_data.get("current_question")
-    player_id = update.effective_user.id
 
-    session = Session()
-    player = session.query(Player).filter_by(telegram_id=player_id).first()
-    option = session.query(QuestionOption).get(option_id)
+async def _record_answer(update: Update, context: CallbackContext, engine, Session):
+    """Records a survey answer and asks the next question."""
+    query = update.callback_query
+    bank = _survey_bank(context, Session)
+    telegram_id = update.effective_user.id
+    # Double taps may reach different workers; answers are recorded one at a time
+    async with _coordinator(context).lock(f"user:{telegram_id}"):
+        question_id, message_id, responses = _load_survey(context, telegram_id)
+        try:
+            question, _ = bank.options[int(query.data)]
+        except (KeyError, ValueError):
+            question = None
 
-    if not player or not option:
-        session.close()
-        query.edit_message_text(text="An error occurred. Please try again.")
-        return
+        # Presses on stale keyboards, or on another user's question, only get an alert;
+        # the message may be someone else's current question and is left alone
+        pressed_message_id = query.message.message_id if query.message else None
+        if not question or question.id != question_id or (message_id and pressed_message_id != message_id):
+            await query.answer(_text(update, "survey.stale"), show_alert=True)
+            return
+        await query.answer()
 
-    # Store the response
-    if "responses" not in context.user_:
-        context.user_data["responses"] = {}
-        context.user_data["responses"][question_id] = option_id
+        # Store the response
+        responses[question_id] = int(query.data)
 
-    # Move to the next question
-    context.user_data["current_question"] = question_id + 1
-    session.close()
-    await _ask_question(update, context, engine, Session)
+        # Move to the next question
+        await _ask_question(update, context, engine, Session, responses)
 
 
 async def event_create(update: Update, context: CallbackContext, engine, Session):
     """Creates a new event (Admin only)."""
-    admin_telegram_ids = [
-        int(admin_id)
-        for admin_id in os.environ.get("ADMIN_TELEGRAM_IDS", "").split(",")
-    ]
-    if update.effective_user.id not in admin_telegram_ids:
+    chat_id = update.effective_chat.id
+    session = Session()
+    if not _is_admin(session, chat_id, update.effective_user.id):
+        session.close()
         await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="You are not authorized to use this command.",
+            chat_id=chat_id,
+            text=_text(update, "common.not_authorized"),
         )
         return
 
@@ -168,20 +283,65 @@ async def event_create(update: Update, context: CallbackContext, engine, Session
         name = context.args[0]
         description = context.args[1]
         limit = int(context.args[2])
+        date = datetime.strptime(" ".join(context.args[3:5]), "%Y-%m-%d %H:%M") if len(context.args) > 3 else None
     except (IndexError, ValueError):
+        session.close()
         await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="Usage: /event_create <name> <description> <limit>",
+            chat_id=chat_id,
+            text=_text(update, "event_create.usage"),
         )
         return
 
-    session = Session()
-    event = Event(name=name, description=description, max_participants=limit)
+    event = Event(chat_id=chat_id, name=name, description=description, max_participants=limit, date=date)
     session.add(event)
+    session.flush()
+    # Reminders before the game and closing it afterwards
+    jobs = schedule_event_jobs(session, event)
     session.commit()
+    event_id = event.id
     session.close()
 
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Event '{name}' created successfully.")
+    scheduler = context.bot_data.get("scheduler")
+    if scheduler and jobs:
+        scheduler.push(jobs)
+
+    await context.bot.send_message(chat_id=chat_id, text=_text(update, "event_create.done", name=name))
+    roster = context.bot_data.get("roster_updater")
+    if roster:
+        await roster.post(event_id)
+
+
+def _add_participant(session, event_id, chat_id, telegram_id):
+    """Adds a player to an event if there is room.
+
+    Returns (error message key, has pinned roster); the key is None once the player is added.
+    """
+    # Events and players from other groups are invisible here
+    event = session.query(Event).filter_by(id=event_id, chat_id=chat_id).first()
+    if not event:
+        return "common.event_not_found", False
+    player = _group_player(session, chat_id, telegram_id)
+    if not player:
+        return "common.not_registered", False
+
+    # Check if the player is already participating
+    if (
+        session.query(EventParticipant)
+        .filter_by(event_id=event_id, player_id=player.id)
+        .first()
+    ):
+        return "event_join.already", False
+
+    # Check if the event is full, counting rows rather than loading event.participants
+    taken = session.query(func.count(EventParticipant.id)).filter_by(event_id=event_id).scalar()
+    if taken >= event.max_participants:
+        return "event_join.full", False
+
+    session.add(EventParticipant(event_id=event_id, player_id=player.id))
+    stats.record(session, {player.id: {"events_joined": 1}})
+    has_roster = event.roster_message_id is not None
+    session.commit()
+    return None, has_roster
 
 
 async def event_join(update: Update, context: CallbackContext, engine, Session):
@@ -190,61 +350,551 @@ async def event_join(update: Update, context: CallbackContext, engine, Session):
         event_id = int(context.args[0])
     except (IndexError, ValueError):
         await context.bot.send_message(
-            chat_id=update.effective_chat.id, text="Usage: /event_join <event_id>"
+            chat_id=update.effective_chat.id, text=_text(update, "event_join.usage")
         )
         return
 
-    session = Session()
-    event = session.query(Event).get(event_id)
-    player = session.query(Player).filter_by(telegram_id=update.effective_user.id).first()
+    # Serializes the capacity check and the insert across every worker
+    try:
+        async with _coordinator(context).lock(f"event:{event_id}"):
+            session = Session()
+            try:
+                reply, has_roster = _add_participant(session, event_id, update.effective_chat.id, update.effective_user.id)
+            finally:
+                session.close()
+    except LockTimeout:
+        reply, has_roster = "common.busy", False
+
+    if reply:
+        await context.bot.send_message(chat_id=update.effective_chat.id, text=_text(update, reply))
+        return
 
+    # The pinned roster shows the join; only confirm separately without one
+    roster = context.bot_data.get("roster_updater")
+    if roster and has_roster:
+        roster.schedule(event_id)
+        return
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id, text=_text(update, "event_join.done")
+    )
+
+
+def _remove_participant(session, event_id, chat_id, telegram_id):
+    """Removes a player from an event and takes the game back out of their stats.
+
+    Returns (error message key, has pinned roster); the key is None once the player is removed.
+    """
+    event = session.query(Event.roster_message_id).filter_by(id=event_id, chat_id=chat_id).first()
+    player = session.query(Player.id).filter_by(telegram_id=telegram_id).first()
     if not event or not player:
-        session.close()
+        return "event_leave.not_participating", False
+
+    # Stats follow the rows actually deleted, with the outcome they had
+    removed = session.execute(
+        delete(EventParticipant)
+        .where(EventParticipant.event_id == event_id, EventParticipant.player_id == player.id)
+        .returning(EventParticipant.outcome)
+    ).all()
+    if not removed:
+        return "event_leave.not_participating", False
+    deltas = {}
+    for row in removed:
+        stats.add_deltas(deltas, player.id, {"events_joined": -1, **stats.outcome_deltas(row.outcome, -1)})
+    stats.record(session, deltas)
+    if any(row.outcome in stats.FORM_LETTERS for row in removed):
+        stats.refresh_form(session, [player.id])
+    session.commit()
+    return None, event.roster_message_id is not None
+
+
+async def event_leave(update: Update, context: CallbackContext, engine, Session):
+    """Allows a player to leave an event."""
+    try:
+        event_id = int(context.args[0])
+    except (IndexError, ValueError):
         await context.bot.send_message(
-            chat_id=update.effective_chat.id, text="Event or player not found."
+            chat_id=update.effective_chat.id, text=_text(update, "event_leave.usage")
         )
         return
 
-    # Check if the player is already participating
-    if (
-        session.query(EventParticipant)
-        .filter_by(event_id=event_id, player_id=player.id)
-        .first()
-    ):
+    # Serializes the removal with joins and results for the same event
+    try:
+        async with _coordinator(context).lock(f"event:{event_id}"):
+            session = Session()
+            try:
+                reply, has_roster = _remove_participant(session, event_id, update.effective_chat.id, update.effective_user.id)
+            finally:
+                session.close()
+    except LockTimeout:
+        reply, has_roster = "common.busy", False
+
+    if reply:
+        await context.bot.send_message(chat_id=update.effective_chat.id, text=_text(update, reply))
+        return
+
+    roster = context.bot_data.get("roster_updater")
+    if roster and has_roster:
+        roster.schedule(event_id)
+        return
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id, text=_text(update, "event_leave.done")
+    )
+
+
+async def series_create(update: Update, context: CallbackContext, engine, Session):
+    """Creates a weekly recurring event series (Admin only)."""
+    chat_id = update.effective_chat.id
+    session = Session()
+    if not _is_admin(session, chat_id, update.effective_user.id):
         session.close()
         await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="You are already participating in this event.",
+            chat_id=chat_id,
+            text=_text(update, "common.not_authorized"),
         )
         return
 
-    # Check if the event is full
-    if len(event.participants) >= event.max_participants:
+    try:
+        name = context.args[0]
+        weekday = parse_weekday(context.args[1])
+        start_time = datetime.strptime(context.args[2], "%H:%M").time()
+        limit = int(context.args[3])
+        # The last day is included
+        until = datetime.strptime(context.args[4], "%Y-%m-%d").replace(hour=23, minute=59) if len(context.args) > 4 else None
+    except (IndexError, KeyError, ValueError):
         session.close()
         await context.bot.send_message(
-            chat_id=update.effective_chat.id, text="This event is full."
+            chat_id=chat_id,
+            text=_text(update, "series_create.usage"),
         )
         return
 
-    participant = EventParticipant(event_id=event_id, player_id=player.id)
-    session.add(participant)
+    series = EventSeries(
+        chat_id=chat_id, name=name, weekday=weekday, start_time=start_time, max_participants=limit, until=until
+    )
+    session.add(series)
+    session.flush()
+    jobs, created = materialize_series(session, [series.id])
+    series_id = series.id
+    session.commit()
+    session.close()
+
+    scheduler = context.bot_data.get("scheduler")
+    if scheduler and jobs:
+        scheduler.push(jobs)
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=_text(update, "series_create.done", name=name, series_id=series_id, count=len(created)),
+    )
+    roster = context.bot_data.get("roster_updater")
+    if roster:
+        for event_id in created:
+            await roster.post(event_id)
+
+
+async def series_join(update: Update, context: CallbackContext, engine, Session):
+    """Makes a player a regular of a series, joining its upcoming games."""
+    chat_id = update.effective_chat.id
+    try:
+        series_id = int(context.args[0])
+    except (IndexError, ValueError):
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "series_join.usage"))
+        return
+
+    session = Session()
+    try:
+        series = session.query(EventSeries).filter_by(id=series_id, chat_id=chat_id, is_active=True).first()
+        player = _group_player(session, chat_id, update.effective_user.id) if series else None
+        if not series or not player:
+            await context.bot.send_message(
+                chat_id=chat_id, text=_text(update, "series_join.not_found" if not series else "common.not_registered")
+            )
+            return
+
+        event_ids = upcoming_events(session, series.id)
+        # The same locks as /event_join, taken in id order so two joins cannot deadlock
+        async with contextlib.AsyncExitStack() as locks:
+            for event_id in event_ids:
+                await locks.enter_async_context(_coordinator(context).lock(f"event:{event_id}"))
+            added = add_regular(session, series, player.id, event_ids)
+            session.commit()
+    except LockTimeout:
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "common.busy"))
+        return
+    finally:
+        session.close()
+
+    if added is None:
+        text = _text(update, "series_join.already")
+    else:
+        text = _text(update, "series_join.done", count=len(added))
+        roster = context.bot_data.get("roster_updater")
+        if roster:
+            for event_id in added:
+                roster.schedule(event_id)
+    await context.bot.send_message(chat_id=chat_id, text=text)
+
+
+async def event_list(update: Update, context: CallbackContext, engine, Session):
+    """Lists the active events of the current group."""
+    chat_id = update.effective_chat.id
+    session = Session()
+    events = (
+        session.query(Event.id, Event.name, Event.date, Event.max_participants)
+        .filter_by(chat_id=chat_id, is_active=True)
+        .order_by(Event.date)
+        .all()
+    )
+    session.close()
+
+    if not events:
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "event_list.empty"))
+        return
+
+    lines = [_text(update, "event_list.header")]
+    for event in events:
+        key = "event_list.item_dated" if event.date else "event_list.item"
+        lines.append(_text(update, key, id=event.id, name=event.name, date=event.date, limit=event.max_participants))
+    await context.bot.send_message(chat_id=chat_id, text="\n".join(lines))
+
+
+def _player_filter(token):
+    """Matches a player given as @handle or Telegram ID."""
+    if token.lstrip("-").isdigit():
+        return Player.telegram_id == int(token)
+    return Player.telegram_handle == token.lstrip("@")
+
+
+def _set_outcomes(session, event_id, chat_id, new_outcome, tokens):
+    """Sets the outcome of the event's participants named by `tokens` and updates their stats.
+
+    Returns the participants found, or None when the event is not in the chat.
+    """
+    if not session.query(Event.id).filter_by(id=event_id, chat_id=chat_id).first():
+        return None
+    rows = (
+        session.query(EventParticipant.id, EventParticipant.outcome, Player.telegram_id, Player.telegram_handle)
+        .join(Player, EventParticipant.player_id == Player.id)
+        .filter(EventParticipant.event_id == event_id, or_(*[_player_filter(token) for token in tokens]))
+        .all()
+    )
+    by_outcome = {}
+    for row in rows:
+        if row.outcome != new_outcome:
+            by_outcome.setdefault(row.outcome, []).append(row.id)
+
+    # One update per previous outcome; stats follow the rows that still had it
+    deltas = {}
+    form_changed = []
+    for old_outcome, participant_ids in by_outcome.items():
+        changed = session.execute(
+            sql_update(EventParticipant)
+            .where(
+                EventParticipant.id.in_(participant_ids),
+                EventParticipant.outcome.is_(None) if old_outcome is None else EventParticipant.outcome == old_outcome,
+            )
+            .values(outcome=new_outcome)
+            .returning(EventParticipant.player_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for row in changed:
+            stats.add_deltas(deltas, row.player_id, stats.outcome_deltas(old_outcome, -1))
+            stats.add_deltas(deltas, row.player_id, stats.outcome_deltas(new_outcome))
+            if old_outcome in stats.FORM_LETTERS or new_outcome in stats.FORM_LETTERS:
+                form_changed.append(row.player_id)
+    stats.record(session, deltas)
+    stats.refresh_form(session, form_changed)
     session.commit()
+    return rows
+
+
+async def event_result(update: Update, context: CallbackContext, engine, Session):
+    """Records the outcome of a game for some of its players (Admin only)."""
+    chat_id = update.effective_chat.id
+    session = Session()
+    if not _is_admin(session, chat_id, update.effective_user.id):
+        session.close()
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=_text(update, "common.not_authorized"),
+        )
+        return
+
+    try:
+        event_id = int(context.args[0])
+        outcome = context.args[1].lower()
+        tokens = context.args[2:]
+        if (outcome not in stats.OUTCOMES and outcome != "clear") or not tokens:
+            raise ValueError
+    except (IndexError, ValueError):
+        session.close()
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=_text(update, "event_result.usage"),
+        )
+        return
+
     session.close()
 
+    # Serializes the outcome changes with joins and leaves for the same event
+    try:
+        async with _coordinator(context).lock(f"event:{event_id}"):
+            session = Session()
+            try:
+                rows = _set_outcomes(session, event_id, chat_id, None if outcome == "clear" else outcome, tokens)
+            finally:
+                session.close()
+    except LockTimeout:
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "common.busy"))
+        return
+    if rows is None:
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "common.event_not_found"))
+        return
+
+    found = {str(row.telegram_id) for row in rows} | {row.telegram_handle for row in rows if row.telegram_handle}
+    missing = [token for token in tokens if token.lstrip("@") not in found]
+    text = _text(update, "event_result.done", outcome=outcome, count=len(rows))
+    if missing:
+        text += " " + _text(update, "event_result.missing", players=", ".join(missing))
+    await context.bot.send_message(chat_id=chat_id, text=text)
+
+
+def _format_stats(update, label, row):
+    """Renders a player's player_stats row in the caller's language; a missing row shows zeros."""
+    played = row.games_played if row else 0
+    wins = row.wins if row else 0
+    losses = row.losses if row else 0
+    no_shows = row.no_shows if row else 0
+    lines = [
+        _text(update, "stats.header", player=label),
+        _text(update, "stats.joined", count=row.events_joined if row else 0),
+        _text(update, "stats.played_rate" if played else "stats.played",
+              played=played, wins=wins, losses=losses, rate=wins / played if played else 0),
+        _text(update, "stats.no_shows_rate" if no_shows else "stats.no_shows",
+              count=no_shows, rate=no_shows / (played + no_shows) if no_shows else 0),
+    ]
+    if row and row.form:
+        lines.append(_text(update, "stats.form", form=" ".join(row.form)))
+    return "\n".join(lines)
+
+
+async def stats_command(update: Update, context: CallbackContext, engine, Session):
+    """Shows a player's attendance and results; defaults to the caller."""
+    chat_id = update.effective_chat.id
+    token = context.args[0] if context.args else str(update.effective_user.id)
+
+    session = Session()
+    # One lookup through the unique players.telegram_id (or handle), this group's
+    # membership and the player_stats primary key; other groups' players are not shown
+    row = (
+        session.query(Player.name, Player.telegram_handle, PlayerStats)
+        .join(GroupMember, GroupMember.player_id == Player.id)
+        .outerjoin(PlayerStats, PlayerStats.player_id == Player.id)
+        .filter(_player_filter(token), GroupMember.chat_id == chat_id)
+        .first()
+    )
+    session.close()
+
+    if not row:
+        text = _text(update, "stats.player_not_found" if context.args else "common.not_registered")
+        await context.bot.send_message(chat_id=chat_id, text=text)
+        return
+
+    label = row.name or (f"@{row.telegram_handle}" if row.telegram_handle else _text(update, "common.player"))
+    await context.bot.send_message(chat_id=chat_id, text=_format_stats(update, label, row.PlayerStats))
+
+
+async def admin_add(update: Update, context: CallbackContext, engine, Session):
+    """Grants admin rights in the current group to another user (Admin only)."""
+    chat_id = update.effective_chat.id
+    session = Session()
+    if not _is_admin(session, chat_id, update.effective_user.id):
+        session.close()
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=_text(update, "common.not_authorized"),
+        )
+        return
+
+    try:
+        telegram_id = int(context.args[0])
+    except (IndexError, ValueError):
+        session.close()
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "admin_add.usage"))
+        return
+
+    if not _is_admin(session, chat_id, telegram_id):
+        session.add(GroupAdmin(chat_id=chat_id, telegram_id=telegram_id))
+        session.commit()
+    session.close()
+
+    await context.bot.send_message(chat_id=chat_id, text=_text(update, "admin_add.done", telegram_id=telegram_id))
+
+
+async def profiling_command(update: Update, context: CallbackContext, engine, Session):
+    """Turns update profiling on or off (global admins only)."""
+    chat_id = update.effective_chat.id
+    if update.effective_user.id not in _global_admin_ids():
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=_text(update, "common.not_authorized"),
+        )
+        return
+
+    profiler = context.bot_data.get("profiler")
+    try:
+        mode = context.args[0].lower()
+        if mode not in ("on", "off") or not profiler:
+            raise ValueError
+        sample_rate = float(context.args[1]) if len(context.args) > 1 else None
+        threshold = float(context.args[2]) if len(context.args) > 2 else None
+    except (IndexError, ValueError):
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=_text(update, "profiling.usage"),
+        )
+        return
+
+    settings = profiler.configure(enabled=mode == "on", sample_rate=sample_rate, threshold=threshold)
     await context.bot.send_message(
-        chat_id=update.effective_chat.id, text="You have successfully joined the event!"
+        chat_id=chat_id,
+        text=_text(
+            update,
+            "profiling.enabled" if settings["enabled"] else "profiling.disabled",
+            sample_rate=settings["sample_rate"],
+            threshold=settings["threshold"],
+        ),
     )
 
 
+def _match_events(update, session, events):
+    """Solves team assignment for the participants of the given events, one court per event."""
+    rows = (
+        session.query(
+            EventParticipant.event_id,
+            Player.id,
+            Player.name,
+            Player.telegram_handle,
+            Player.skill_level,
+            Player.preferred_position,
+        )
+        .join(Player, EventParticipant.player_id == Player.id)
+        .filter(EventParticipant.event_id.in_([event.id for event in events]))
+        .order_by(EventParticipant.joined_at, EventParticipant.id)
+        .all()
+    )
+
+    # Players signed up for several overlapping events may play on any of them
+    courts_of = {}
+    names = {}
+    skills = {}
+    positions = {}
+    for row in rows:
+        courts_of.setdefault(row.id, set()).add(row.event_id)
+        names[row.id] = row.name or (
+            f"@{row.telegram_handle}" if row.telegram_handle else _text(update, "match.player", id=row.id)
+        )
+        skills[row.id] = row.skill_level or 0
+        positions[row.id] = row.preferred_position
+    players = [
+        MatchPlayer(id=player_id, skill=skills[player_id], position=positions[player_id], courts=frozenset(courts))
+        for player_id, courts in courts_of.items()
+    ]
+    courts = [Court(id=event.id, capacity=event.max_participants or 12) for event in events]
+    return solve(players, courts), names, skills
+
+
+def _format_match(update, events, result, names, skills):
+    lines = []
+    for event in events:
+        lines.append(_text(update, "match.court", name=event.name, id=event.id))
+        for label, team in zip(("A", "B"), result.teams[event.id]):
+            members = ", ".join(names[player_id] for player_id in team) or "-"
+            skill = sum(skills[player_id] for player_id in team)
+            lines.append(_text(update, "match.team", label=label, skill=skill, members=members))
+    if result.waitlist:
+        lines.append(_text(update, "match.waitlist", players=", ".join(names[player_id] for player_id in result.waitlist)))
+    return "\n".join(lines)
+
+
+async def matchmake_command(update: Update, context: CallbackContext, engine, Session):
+    """Distributes the players of concurrent events across courts and teams (Admin only).
+
+    With a single event ID, every active event of the group starting at the
+    same time is included.
+    """
+    chat_id = update.effective_chat.id
+    session = Session()
+    if not _is_admin(session, chat_id, update.effective_user.id):
+        session.close()
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=_text(update, "common.not_authorized"),
+        )
+        return
+
+    try:
+        event_ids = [int(arg) for arg in context.args]
+        if not event_ids:
+            raise ValueError
+    except ValueError:
+        session.close()
+        await context.bot.send_message(
+            chat_id=chat_id, text=_text(update, "matchmake.usage")
+        )
+        return
+
+    events = (
+        session.query(Event)
+        .filter(Event.chat_id == chat_id, Event.id.in_(event_ids))
+        .order_by(Event.id)
+        .all()
+    )
+    if len(events) == 1 and events[0].date:
+        events = (
+            session.query(Event)
+            .filter_by(chat_id=chat_id, is_active=True, date=events[0].date)
+            .order_by(Event.id)
+            .all()
+        )
+    if not events:
+        session.close()
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "common.event_not_found"))
+        return
+
+    result, names, skills = _match_events(update, session, events)
+    text = _format_match(update, events, result, names, skills)
+    session.close()
+
+    await context.bot.send_message(chat_id=chat_id, text=text)
+
+
 async def balance_teams_command(update: Update, context: CallbackContext, engine, Session):
     """Balances teams for a specific event (Admin only)."""
-    admin_telegram_ids = [
-        int(admin_id)
-        for admin_id in os.environ.get("ADMIN_TELEGRAM_IDS", "").split(",")
-    ]
-    if update.effective_user.id not in admin_telegram_ids:
+    chat_id = update.effective_chat.id
+    session = Session()
+    if not _is_admin(session, chat_id, update.effective_user.id):
+        session.close()
         await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="You are not authorized to use this command.",
+            chat_id=chat_id,
+            text=_text(update, "common.not_authorized"),
         )
         return
+
+    try:
+        event_id = int(context.args[0])
+    except (IndexError, ValueError):
+        session.close()
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "balance_teams.usage"))
+        return
+
+    event = session.query(Event).filter_by(id=event_id, chat_id=chat_id).first()
+    if not event:
+        session.close()
+        await context.bot.send_message(chat_id=chat_id, text=_text(update, "common.event_not_found"))
+        return
+
+    result, names, skills = _match_events(update, session, [event])
+    text = _format_match(update, [event], result, names, skills)
+    session.close()
+
+    await context.bot.send_message(chat_id=chat_id, text=text)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Time, ForeignKey, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, mapped_column
 from sqlalchemy import Index
@@ -10,7 +10,7 @@ class Player(Base):
     __tablename__ = 'players'
 
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(Integer, unique=True, nullable=False)
+    telegram_id = Column(BigInteger, unique=True, nullable=False)  # Telegram user IDs exceed 32 bits
     telegram_handle = Column(String(100), unique=True, nullable=True)
     name = Column(String(100), nullable=True)
     skill_level = Column(Integer, default=0)
@@ -24,6 +24,9 @@ class Player(Base):
     # Events the player is participating in
     events = relationship("EventParticipant", back_populates="player")
 
+    # Group chats the player belongs to
+    groups = relationship("GroupMember", back_populates="player")
+
     def __repr__(self):
         return f"<Player(telegram_id={self.telegram_id}, name={self.name})>"
 
@@ -75,6 +78,7 @@ class Event(Base):
     __tablename__ = 'events'
 
     id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)  # Owning group chat
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     date = Column(DateTime, nullable=True)
@@ -82,12 +86,14 @@ class Event(Base):
     max_participants = Column(Integer, default=12)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    roster_message_id = Column(Integer, nullable=True)  # Pinned roster message in the chat
+    series_id = Column(Integer, ForeignKey('event_series.id'), nullable=True)  # Set for recurring games
 
     # Participants in this event
     participants = relationship("EventParticipant", back_populates="event")
 
     def __repr__(self):
-        return f"<Event(name={self.name}, date={self.date})>"
+        return f"<Event(chat_id={self.chat_id}, name={self.name}, date={self.date})>"
 
 class EventParticipant(Base):
     __tablename__ = 'event_participants'
@@ -96,6 +102,7 @@ class EventParticipant(Base):
     event_id = Column(Integer, ForeignKey('events.id'), nullable=False)
     player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
     joined_at = Column(DateTime, default=datetime.utcnow)
+    outcome = Column(String(10), nullable=True)  # 'win', 'loss' or 'noshow', recorded after the game
 
     # Relationships
     event = relationship("Event", back_populates="participants")
@@ -104,8 +111,141 @@ class EventParticipant(Base):
     def __repr__(self):
         return f"<EventParticipant(event_id={self.event_id}, player_id={self.player_id})>"
 
+class EventSeries(Base):
+    __tablename__ = 'event_series'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    name = Column(String(100), nullable=False)
+    description = Column(Text, nullable=True)
+    weekday = Column(Integer, nullable=False)  # 0 is Monday
+    start_time = Column(Time, nullable=False)
+    max_participants = Column(Integer, default=12)
+    until = Column(DateTime, nullable=True)  # No occurrences after this moment
+    materialized_until = Column(DateTime, nullable=True)  # Events exist up to here
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Regular players, added to every new occurrence
+    members = relationship("SeriesMember", back_populates="series")
+
+    def __repr__(self):
+        return f"<EventSeries(chat_id={self.chat_id}, name={self.name}, weekday={self.weekday})>"
+
+class SeriesMember(Base):
+    __tablename__ = 'series_members'
+
+    id = Column(Integer, primary_key=True)
+    series_id = Column(Integer, ForeignKey('event_series.id'), nullable=False)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    series = relationship("EventSeries", back_populates="members")
+    player = relationship("Player")
+
+    def __repr__(self):
+        return f"<SeriesMember(series_id={self.series_id}, player_id={self.player_id})>"
+
+class ScheduledJob(Base):
+    __tablename__ = 'scheduled_jobs'
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, ForeignKey('events.id'), nullable=True)
+    series_id = Column(Integer, ForeignKey('event_series.id'), nullable=True)
+    kind = Column(String(20), nullable=False)  # 'reminder', 'close' or 'series'
+    due_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ScheduledJob(event_id={self.event_id}, kind={self.kind}, due_at={self.due_at})>"
+
+class GroupMember(Base):
+    __tablename__ = 'group_members'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    joined_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    player = relationship("Player", back_populates="groups")
+
+    def __repr__(self):
+        return f"<GroupMember(chat_id={self.chat_id}, player_id={self.player_id})>"
+
+class GroupAdmin(Base):
+    __tablename__ = 'group_admins'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    telegram_id = Column(BigInteger, nullable=False)
+    added_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<GroupAdmin(chat_id={self.chat_id}, telegram_id={self.telegram_id})>"
+
+class CoordinationLock(Base):
+    __tablename__ = 'coordination_locks'
+
+    name = Column(String(200), primary_key=True)
+    owner = Column(String(64), nullable=False)
+    expires_at = Column(DateTime, nullable=False)  # Lease end, so a crashed worker cannot hold it forever
+
+class CoordinationCounter(Base):
+    __tablename__ = 'coordination_counters'
+
+    name = Column(String(200), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+class SharedState(Base):
+    __tablename__ = 'shared_state'
+
+    key = Column(String(200), primary_key=True)
+    value = Column(Text, nullable=False)  # JSON
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class CacheInvalidation(Base):
+    __tablename__ = 'cache_invalidations'
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(200), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class PlayerStats(Base):
+    __tablename__ = 'player_stats'
+
+    # Running totals, kept in step with event_participants by utils.stats
+    player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
+    events_joined = Column(Integer, nullable=False, default=0)
+    games_played = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    no_shows = Column(Integer, nullable=False, default=0)
+    form = Column(String(10), nullable=False, default="")  # Latest results first, e.g. "WWL"
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PlayerStats(player_id={self.player_id}, games_played={self.games_played}, wins={self.wins})>"
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
 # Indexes for performance
-Index('player_telegram_id_idx', Player.telegram_id)
+# players.telegram_id is unique, which already gives it an index
 Index('event_date_idx', Event.date)
-Index('event_participant_event_id_idx', EventParticipant.event_id)
+# Every event query is scoped to one chat, so chat_id leads the composite index
+Index('event_chat_active_date_idx', Event.chat_id, Event.is_active, Event.date)
+Index('event_series_date_idx', Event.series_id, Event.date)
+Index('scheduled_job_due_at_idx', ScheduledJob.due_at)
+Index('cache_invalidation_created_at_idx', CacheInvalidation.created_at)
+Index('series_member_series_player_idx', SeriesMember.series_id, SeriesMember.player_id, unique=True)
+Index('group_member_chat_player_idx', GroupMember.chat_id, GroupMember.player_id, unique=True)
+Index('group_admin_chat_telegram_idx', GroupAdmin.chat_id, GroupAdmin.telegram_id, unique=True)
+# Serves both the duplicate check in event_join and every lookup by event_id alone
+Index('event_participant_event_player_idx', EventParticipant.event_id, EventParticipant.player_id, unique=True)
 Index('event_participant_player_id_idx', EventParticipant.player_id)
@@ -18,6 +18,9 @@ setup(
         "python-dotenv>=1.0.0",
     ],
     extras_require={
+        "speedups": [
+            "orjson",
+        ],
         "testing": [
             "pytest>=8.0",
             "pytest-cov>=4.0",
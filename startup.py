@@ -2,18 +2,41 @@ import logging
 import os
 from fastapi import FastAPI
 from telegram import Bot
-from telegram.ext import Application
+from telegram.ext import Application, ApplicationBuilder, PersistenceInput, PicklePersistence
+from utils.ingest import ALLOWED_UPDATES
+from utils.drain import DrainController
 
 logger = logging.getLogger(__name__)
 
-async def startup_event(app: FastAPI, TELEGRAM_BOT_TOKEN: str, WEBHOOK_URL: str, application: Application):
+def build_application(bot: Bot, persistence_file: str = None):
+    """Builds the Application around the bot, keeping user and chat data in `persistence_file` if given.
+
+    bot_data holds the shared services (roster updater, scheduler, coordinator)
+    and is not persisted: restoring it would replace them, and they cannot be
+    pickled. Arbitrary callback data is not used either.
+    """
+    builder = ApplicationBuilder().bot(bot)
+    if persistence_file:
+        store_data = PersistenceInput(bot_data=False, callback_data=False)
+        builder = builder.persistence(PicklePersistence(persistence_file, store_data=store_data))
+    return builder.build()
+
+
+async def startup_event(app: FastAPI, TELEGRAM_BOT_TOKEN: str, WEBHOOK_URL: str, application: Application, WEBHOOK_SECRET_TOKEN: str = None):
     """Set up the bot on startup."""
     logger.info(f"Starting bot in webhook mode")
+    if not WEBHOOK_SECRET_TOKEN:
+        logger.warning("WEBHOOK_SECRET_TOKEN is not set: the webhook accepts updates from anyone who knows its URL")
     try:
+        # Loads persisted user/chat data so survey state survives restarts
+        await application.initialize()
         if not WEBHOOK_URL:
             raise ValueError("WEBHOOK_URL must be set when MODE is webhook")
         logger.info(f"Setting webhook to {WEBHOOK_URL}")
-        webhook_result = await application.bot.set_webhook(WEBHOOK_URL)
+        # Telegram filters out update types we never handle and signs requests with the secret
+        webhook_result = await application.bot.set_webhook(
+            WEBHOOK_URL, allowed_updates=ALLOWED_UPDATES, secret_token=WEBHOOK_SECRET_TOKEN
+        )
         if not webhook_result:
             logger.error("Failed to set webhook. Please check the WEBHOOK_URL and bot token.")
             # Consider raising an exception here to prevent the app from starting if the webhook fails to set
@@ -23,10 +46,37 @@ async def startup_event(app: FastAPI, TELEGRAM_BOT_TOKEN: str, WEBHOOK_URL: str,
         logger.error(f"Startup error: {e}")
         raise
 
-async def shutdown_event(app: FastAPI, application: Application):
-    """Clean up resources on shutdown."""
+async def shutdown_event(app: FastAPI, application: Application, drain: DrainController = None, drain_deadline: float = 10.0):
+    """Drain in-flight updates, flush pending output and clean up resources.
+
+    Returns a report of what could not be completed before shutting down.
+    """
+    report = {}
     try:
+        scheduler = application.bot_data.get("scheduler")
+        if scheduler:
+            # A run sending reminders gets to finish; jobs not yet due stay in the database for the next instance
+            report["unsent_reminders"] = await scheduler.stop(drain_deadline)
+
+        if drain:
+            report["unfinished_updates"] = await drain.drain(drain_deadline)
+
+        # Pending roster edits are sent now rather than lost with the process
+        roster = application.bot_data.get("roster_updater")
+        if roster:
+            report["roster_edits_flushed"] = len(roster.pending)
+            await roster.flush()
+
+        coordinator = application.bot_data.get("coordinator")
+        if coordinator:
+            await coordinator.stop()
+
+        # Also writes user_data/chat_data to the persistence backend, if configured
         await application.shutdown()
-        logger.info("Bot shutting down")
+
+        if drain:
+            report["rejected_requests"] = drain.rejected
+        logger.info(f"Bot shutting down: {report}")
     except Exception as e:
         logger.error(f"Shutdown error: {e}")
+    return report
@@ -0,0 +1,44 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+from tests.handler_cases import ADMIN_ID, build_harness
+from utils.db import init_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def harness(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMIN_TELEGRAM_IDS", str(ADMIN_ID))
+    monkeypatch.setenv("SURVEY_MODE", "full")
+    harness = build_harness(str(tmp_path))
+    yield harness
+    harness.engine.dispose()
+
+
+@pytest.fixture
+def deployed_app(tmp_path, monkeypatch):
+    """The module vercel.json serves, imported against a fresh database in tmp_path."""
+    with open(os.path.join(ROOT, "vercel.json")) as f:
+        config = json.load(f)
+    entry = config["builds"][0]["src"]
+    assert all(route["dest"] == entry for route in config["routes"])
+    # volleybot.db is opened relative to the working directory; data/ is read from there too
+    os.symlink(os.path.join(ROOT, "data"), tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "123:abc")
+    monkeypatch.setenv("ADMIN_TELEGRAM_IDS", str(ADMIN_ID))
+    monkeypatch.setenv("CRON_SECRET", "cron-secret")
+    monkeypatch.setenv("ADMIN_API_TOKEN", "admin-secret")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
+    name = os.path.splitext(entry)[0]
+    monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module(name)
+    init_db(module.engine)
+    yield module
+    sys.modules.pop(name, None)
+    module.engine.dispose()
@@ -0,0 +1,47 @@
+"""Stand-ins for the Telegram objects handlers use, recording what the bot would send."""
+import itertools
+from types import SimpleNamespace
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.edited = []
+        self.alerts = []
+        self._message_ids = itertools.count(1)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+        return SimpleNamespace(chat_id=chat_id, message_id=next(self._message_ids), text=text)
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self.edited.append(text)
+
+    async def pin_chat_message(self, chat_id, message_id, **kwargs):
+        pass
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot, data, message_id=None):
+        self.bot = bot
+        self.data = data
+        self.message = SimpleNamespace(message_id=message_id) if message_id is not None else None
+
+    async def answer(self, text=None, show_alert=False, **kwargs):
+        if text:
+            self.bot.alerts.append(text)
+
+    async def edit_message_text(self, text, **kwargs):
+        self.bot.edited.append(text)
+
+
+def make_update(chat_id, telegram_id, username=None, callback_data=None, bot=None, language_code="en", message_id=None):
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_user=SimpleNamespace(id=telegram_id, username=username, language_code=language_code),
+        callback_query=FakeCallbackQuery(bot, callback_data, message_id) if callback_data is not None else None,
+    )
+
+
+def make_context(bot, bot_data, args=()):
+    return SimpleNamespace(args=list(args), bot=bot, bot_data=bot_data, user_data={}, chat_data={})
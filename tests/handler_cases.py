@@ -0,0 +1,222 @@
+"""Seeded database and one sample update per handler, shared by the handler tests.
+
+The database is a SQLite file opened through a cursor that counts the rows
+it fetches; `run_case` sends one update through the stand-in bot.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import handlers
+from models import (
+    Base, Event, EventParticipant, EventSeries, GroupMember, Player, Question, QuestionOption, SeriesMember
+)
+from tests.fakes import FakeBot, make_context, make_update
+from utils.coordination import DatabaseCoordinator
+from utils.profiling import UpdateProfiler
+from utils.roster import RosterUpdater
+from utils import stats
+from utils.scheduler import JobScheduler, materialize_series
+
+CHAT_ID = -100
+ADMIN_ID = 1
+PLAYERS = 30
+NEW_USER_ID = 9999
+GAME_DATE = datetime.utcnow().replace(microsecond=0) + timedelta(days=3)
+
+
+class QueryCounter:
+    """Counts statements with engine events and rows with a cursor that tallies fetches."""
+
+    def __init__(self):
+        self.statements = []
+        self.rows = 0
+
+    def reset(self):
+        self.statements = []
+        self.rows = 0
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+def _counting_connect(path, counter):
+    class CountingCursor(sqlite3.Cursor):
+        def _count(self, rows):
+            counter.rows += len(rows)
+            return rows
+
+        def fetchone(self):
+            row = super().fetchone()
+            counter.rows += row is not None
+            return row
+
+        def fetchmany(self, *args, **kwargs):
+            return self._count(super().fetchmany(*args, **kwargs))
+
+        def fetchall(self):
+            return self._count(super().fetchall())
+
+    class CountingConnection(sqlite3.Connection):
+        def cursor(self, factory=CountingCursor):
+            return super().cursor(factory)
+
+    return lambda: sqlite3.connect(str(path), factory=CountingConnection, check_same_thread=False)
+
+
+def _seed(Session):
+    session = Session()
+    with open(os.path.join(os.path.dirname(__file__), "..", "data", "initial_data.json")) as f:
+        for q_data in json.load(f)["questions"]:
+            question = Question(question_text=q_data["question_text"], question_weight=q_data["question_weight"])
+            question.options = [
+                QuestionOption(option_text=option["option_text"], response_points=option["response_points"])
+                for option in q_data["options"]
+            ]
+            session.add(question)
+
+    players = [
+        Player(telegram_id=ADMIN_ID + i, telegram_handle=f"player{i}", name=f"Player {i}", skill_level=i % 20)
+        for i in range(PLAYERS)
+    ]
+    session.add_all(players)
+    session.flush()
+    session.add_all([GroupMember(chat_id=CHAT_ID, player_id=player.id) for player in players])
+
+    # Two courts at the same time; the first one is full and has a roster message
+    full = Event(chat_id=CHAT_ID, name="Court 1", max_participants=12, date=GAME_DATE, is_active=True, roster_message_id=500)
+    open_court = Event(chat_id=CHAT_ID, name="Court 2", max_participants=12, date=GAME_DATE, is_active=True, roster_message_id=501)
+    session.add_all([full, open_court])
+    session.flush()
+    session.add_all([EventParticipant(event_id=full.id, player_id=player.id) for player in players[:12]])
+    session.add_all([EventParticipant(event_id=open_court.id, player_id=player.id) for player in players[12:20]])
+
+    series = EventSeries(chat_id=CHAT_ID, name="Tuesdays", weekday=1, start_time=GAME_DATE.time(), max_participants=12)
+    session.add(series)
+    session.flush()
+    session.add_all([SeriesMember(series_id=series.id, player_id=player.id) for player in players[:6]])
+    session.flush()
+    materialize_series(session, [series.id])
+
+    # Last week's game with its results
+    played = Event(chat_id=CHAT_ID, name="Last week", max_participants=12, date=GAME_DATE - timedelta(days=7), is_active=False)
+    session.add(played)
+    session.flush()
+    session.add_all([
+        EventParticipant(event_id=played.id, player_id=player.id, outcome=("win", "loss", "noshow")[i % 3])
+        for i, player in enumerate(players[:12])
+    ])
+    session.flush()
+    stats.rebuild(session.connection())
+    session.commit()
+    ids = {"full": full.id, "open": open_court.id, "series": series.id, "played": played.id}
+    session.close()
+    return ids
+
+
+def _start_survey(bot_data, telegram_id):
+    """Puts the player at the first question; returns the option they press."""
+    question = bot_data["survey_bank"].questions[0]
+    bot_data["coordinator"].set_state(f"survey:{telegram_id}", {"current_question": question.id, "responses": {}})
+    return str(question.options[0].id)
+
+
+def _last_question(bot_data, telegram_id):
+    """Puts the player at the last question, so their answer completes the survey."""
+    bank = bot_data["survey_bank"]
+    responses = {str(question.id): question.options[0].id for question in bank.questions[:-1]}
+    question = bank.questions[-1]
+    bot_data["coordinator"].set_state(f"survey:{telegram_id}", {"current_question": question.id, "responses": responses})
+    return str(question.options[0].id)
+
+
+Case = namedtuple("Case", "handler user args chat_id press", defaults=((), CHAT_ID, None))
+
+MEMBER_ID = ADMIN_ID + 5  # plays on the full court
+NEWCOMER_ID = ADMIN_ID + 25  # group member without games
+
+CASES = {
+    "start": Case(handlers.start, MEMBER_ID),
+    "register_new": Case(handlers.register, NEW_USER_ID),
+    "register_existing": Case(handlers.register, MEMBER_ID),
+    "register_other_group": Case(handlers.register, MEMBER_ID, chat_id=CHAT_ID - 1),
+    "survey_answer": Case(handlers._process_callback_query, MEMBER_ID, press=_start_survey),
+    "survey_finish": Case(handlers._process_callback_query, MEMBER_ID, press=_last_question),
+    "mydata": Case(handlers._show_my_data, MEMBER_ID),
+    "edit_my_data": Case(handlers.edit_my_data, MEMBER_ID),
+    "event_create": Case(handlers.event_create, ADMIN_ID, ("Friday", "Indoor", "12", GAME_DATE.strftime("%Y-%m-%d"), "19:00")),
+    "event_join": Case(handlers.event_join, NEWCOMER_ID, ("{open}",)),
+    "event_join_full": Case(handlers.event_join, NEWCOMER_ID, ("{full}",)),
+    "event_leave": Case(handlers.event_leave, MEMBER_ID, ("{full}",)),
+    "series_create": Case(handlers.series_create, ADMIN_ID, ("Thursdays", "thu", "19:00", "12")),
+    "series_join": Case(handlers.series_join, NEWCOMER_ID, ("{series}",)),
+    "event_list": Case(handlers.event_list, MEMBER_ID),
+    "event_result": Case(handlers.event_result, ADMIN_ID, ("{played}", "win", "@player2", "@player3", str(ADMIN_ID + 5))),
+    "stats": Case(handlers.stats_command, MEMBER_ID),
+    "stats_other": Case(handlers.stats_command, MEMBER_ID, ("@player0",)),
+    "admin_add": Case(handlers.admin_add, ADMIN_ID, ("777",)),
+    "profiling": Case(handlers.profiling_command, ADMIN_ID, ("off",)),
+    "matchmake": Case(handlers.matchmake_command, ADMIN_ID, ("{full}",)),
+    "balance_teams": Case(handlers.balance_teams_command, ADMIN_ID, ("{full}",)),
+}
+
+
+Harness = namedtuple("Harness", "engine Session bot bot_data counter ids")
+
+
+def build_harness(directory):
+    """Creates and seeds a database under `directory`, with the services handlers find in bot_data."""
+    counter = QueryCounter()
+    engine = create_engine("sqlite://", creator=_counting_connect(os.path.join(directory, "handlers.db"), counter))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    ids = _seed(Session)
+    event.listen(engine, "before_cursor_execute", counter.before_cursor_execute)
+
+    bot = FakeBot()
+    # As in production, locks and shared state cost statements on the bot's database
+    coordinator = DatabaseCoordinator(engine)
+    roster = RosterUpdater(bot, Session, coordinator)
+    profiler = UpdateProfiler(engine, os.path.join(directory, "profiles"))
+    profiler.share(coordinator)
+    bot_data = {
+        "coordinator": coordinator,
+        "roster_updater": roster,
+        "scheduler": JobScheduler(bot, Session, roster=roster),
+        "profiler": profiler,
+    }
+    # Loaded once per process in production, so it is not part of any update
+    handlers._survey_bank(make_context(bot, bot_data), Session)
+    return Harness(engine, Session, bot, bot_data, counter, ids)
+
+
+def run_case(harness, name):
+    run_update(harness, CASES[name])
+
+
+def run_update(harness, case, language_code="en"):
+    """Handles the case's update, including the roster edit it schedules; counts start from zero."""
+    context = make_context(harness.bot, harness.bot_data, [arg.format(**harness.ids) for arg in case.args])
+    callback_data = case.press(harness.bot_data, case.user) if case.press else None
+
+    async def scenario():
+        update = make_update(
+            case.chat_id,
+            case.user,
+            username=f"user{case.user}",
+            callback_data=callback_data,
+            bot=harness.bot,
+            language_code=language_code,
+        )
+        harness.counter.reset()
+        await case.handler(update, context, harness.engine, harness.Session)
+        # Debounced roster edits are part of the update's cost
+        await harness.bot_data["roster_updater"].flush()
+
+    asyncio.run(scenario())
@@ -0,0 +1,192 @@
+import asyncio
+import contextlib
+import multiprocessing
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Event, EventParticipant, GroupMember, Player
+from tests.fakes import FakeBot, make_context, make_update
+from utils.coordination import Coordinator, DatabaseCoordinator, LocalCoordinator, LockTimeout
+from utils.profiling import UpdateProfiler
+
+CHAT_ID = -100
+
+
+def _engine(path):
+    # Competing writers wait for the database lock instead of failing at once
+    return create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "coordination.db"
+    engine = _engine(path)
+    Base.metadata.create_all(engine)
+    yield path, engine
+    engine.dispose()
+
+
+@pytest.fixture(params=["local", "database"])
+def coordinator(request, database):
+    if request.param == "local":
+        return LocalCoordinator()
+    return DatabaseCoordinator(database[1])
+
+
+def test_counters(coordinator):
+    assert coordinator.counter("joins") == 0
+    assert coordinator.incr("joins") == 1
+    assert coordinator.incr("joins", 4) == 5
+    assert coordinator.counter("joins") == 5
+    coordinator.incr("throttle:dropped:user:register", 2)
+    assert coordinator.counters("throttle:") == {"throttle:dropped:user:register": 2}
+
+
+def test_coordinator_is_abstract():
+    with pytest.raises(TypeError):
+        Coordinator()
+
+
+def test_state_round_trip(coordinator):
+    assert coordinator.get_state("survey:1") is None
+    coordinator.set_state("survey:1", {"current_question": 3, "responses": {"1": 2}})
+    coordinator.set_state("survey:1", {"current_question": 4, "responses": {"1": 2, "3": 9}})
+    assert coordinator.get_state("survey:1") == {"current_question": 4, "responses": {"1": 2, "3": 9}}
+    coordinator.delete_state("survey:1")
+    assert coordinator.get_state("survey:1") is None
+
+
+def test_invalidation_reaches_subscribers(coordinator):
+    dropped = []
+    coordinator.subscribe("survey_bank", lambda: dropped.append("survey_bank"))
+    coordinator.invalidate("survey_bank")
+    coordinator.invalidate("other")
+    assert dropped == ["survey_bank"]
+
+
+def test_held_lock_outlives_its_lease(database):
+    holder = DatabaseCoordinator(database[1], lease=0.15)
+    other = DatabaseCoordinator(database[1], lease=0.15)
+
+    async def scenario():
+        async with holder.lock("event:1"):
+            # Renewals keep the lease from running out while the holder works
+            with pytest.raises(LockTimeout):
+                async with other.lock("event:1", timeout=0.5):
+                    pass
+        async with other.lock("event:1", timeout=0.1):
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_profiling_settings_reach_other_workers():
+    coordinator = LocalCoordinator()
+    workers = [UpdateProfiler(None), UpdateProfiler(None)]
+    for profiler in workers:
+        profiler.share(coordinator)
+    workers[0].configure(enabled=True, sample_rate=0.5)
+    assert workers[1].settings() == {"enabled": True, "sample_rate": 0.5, "threshold": 1.0}
+    late = UpdateProfiler(None)
+    late.share(coordinator)
+    late.reload()
+    assert late.enabled
+
+
+class BusyCoordinator(LocalCoordinator):
+    """Every lock is held elsewhere for longer than the caller waits."""
+
+    @contextlib.asynccontextmanager
+    async def lock(self, name, timeout=10.0):
+        raise LockTimeout(name)
+        yield
+
+
+def test_join_reports_a_busy_event(database):
+    import handlers
+
+    engine = database[1]
+    Session = sessionmaker(bind=engine)
+    bot = FakeBot()
+    context = make_context(bot, {"coordinator": BusyCoordinator()}, ["1"])
+    asyncio.run(handlers.event_join(make_update(CHAT_ID, 1000), context, engine, Session))
+    assert bot.sent == ["Too many requests for this right now. Please try again in a moment."]
+
+
+def test_invalidation_reaches_other_workers(database):
+    publisher = DatabaseCoordinator(database[1])
+    worker = DatabaseCoordinator(database[1])
+    dropped = []
+    worker.subscribe("survey_bank", lambda: dropped.append(True))
+    worker.poll()
+    publisher.invalidate("survey_bank")
+    worker.poll()
+    worker.poll()
+    assert dropped == [True]
+
+
+def test_lock_excludes_other_holders(coordinator):
+    async def scenario():
+        async with coordinator.lock("event:1"):
+            with pytest.raises(LockTimeout):
+                async with coordinator.lock("event:1", timeout=0.05):
+                    pass
+            # Other names are independent
+            async with coordinator.lock("event:2", timeout=0.05):
+                pass
+        async with coordinator.lock("event:1", timeout=0.05):
+            pass
+
+    asyncio.run(scenario())
+
+
+def _join_worker(path, telegram_ids, event_id):
+    """Runs /event_join for several players at once in a separate process."""
+    import handlers
+
+    engine = _engine(path)
+    Session = sessionmaker(bind=engine)
+    bot = FakeBot()
+    bot_data = {"coordinator": DatabaseCoordinator(engine)}
+
+    async def join(telegram_id):
+        update = make_update(CHAT_ID, telegram_id)
+        context = make_context(bot, bot_data, [str(event_id)])
+        await handlers.event_join(update, context, engine, Session)
+
+    async def run():
+        await asyncio.gather(*(join(telegram_id) for telegram_id in telegram_ids))
+
+    asyncio.run(run())
+    engine.dispose()
+    return bot.sent
+
+
+def test_event_capacity_under_contention(database):
+    path, engine = database
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    event = Event(chat_id=CHAT_ID, name="Sunday", max_participants=5, is_active=True)
+    session.add(event)
+    players = [Player(telegram_id=1000 + i, name=f"player {i}") for i in range(24)]
+    session.add_all(players)
+    session.flush()
+    session.add_all([GroupMember(chat_id=CHAT_ID, player_id=player.id) for player in players])
+    session.commit()
+    event_id = event.id
+    session.close()
+
+    batches = [[1000 + i for i in range(start, 24, 4)] for start in range(4)]
+    with multiprocessing.get_context("spawn").Pool(len(batches)) as pool:
+        replies = pool.starmap(_join_worker, [(str(path), batch, event_id) for batch in batches])
+    replies = [reply for batch in replies for reply in batch]
+
+    with engine.connect() as conn:
+        joined = conn.execute(
+            select(func.count()).select_from(EventParticipant).where(EventParticipant.event_id == event_id)
+        ).scalar()
+    assert joined == 5
+    assert replies.count("You have successfully joined the event!") == 5
+    assert replies.count("This event is full.") == 19
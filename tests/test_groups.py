@@ -0,0 +1,44 @@
+import handlers
+from models import GroupMember, Player
+from tests.handler_cases import CHAT_ID, Case, run_update
+
+OTHER_CHAT_ID = CHAT_ID - 1
+OUTSIDER_ID = 5000
+
+
+def _add_outsider(harness):
+    """A registered player who only belongs to another group."""
+    session = harness.Session()
+    player = Player(telegram_id=OUTSIDER_ID, telegram_handle="outsider", name="Outsider")
+    session.add(player)
+    session.flush()
+    session.add(GroupMember(chat_id=OTHER_CHAT_ID, player_id=player.id))
+    session.commit()
+    session.close()
+
+
+def test_players_of_other_groups_register_here_before_joining(harness):
+    _add_outsider(harness)
+    join = Case(handlers.event_join, OUTSIDER_ID, ("{open}",))
+
+    run_update(harness, join)
+    assert harness.bot.sent[-1] == "You haven't registered yet. Use /register to join!"
+
+    run_update(harness, Case(handlers.register, OUTSIDER_ID))
+    run_update(harness, join)
+    assert harness.bot.sent[-1] == "You have joined this group's player list!"
+    # The join is shown by editing the pinned roster
+    assert "Outsider" in harness.bot.edited[-1]
+
+
+def test_series_join_and_stats_are_scoped_to_the_group(harness):
+    _add_outsider(harness)
+
+    run_update(harness, Case(handlers.series_join, OUTSIDER_ID, ("{series}",)))
+    run_update(harness, Case(handlers.stats_command, OUTSIDER_ID))
+    run_update(harness, Case(handlers.stats_command, OUTSIDER_ID + 1, ("@outsider",)))
+    assert harness.bot.sent == [
+        "You haven't registered yet. Use /register to join!",
+        "You haven't registered yet. Use /register to join!",
+        "Player not found.",
+    ]
@@ -0,0 +1,29 @@
+from utils import ingest
+
+COMMANDS = frozenset({"event_list", "register"})
+
+
+def _command(text):
+    return {"update_id": 1, "message": {"text": text, "from": {"id": 7}, "chat": {"id": -100}}}
+
+
+def test_malformed_bodies_are_not_updates():
+    assert ingest.parse_update(b'{"update_id": 1}') == {"update_id": 1}
+    assert ingest.parse_update(b'{"update_id": ') is None
+    assert ingest.parse_update(b"[1, 2]") is None
+    assert ingest.parse_update(b"\xff") is None
+
+
+def test_commands_for_other_bots_are_dropped():
+    assert ingest.wants_update(_command("/event_list"), COMMANDS, "volley_bot")
+    assert ingest.wants_update(_command("/event_list@Volley_Bot now"), COMMANDS, "volley_bot")
+    assert not ingest.wants_update(_command("/event_list@other_bot"), COMMANDS, "volley_bot")
+    assert not ingest.wants_update(_command("/unknown@volley_bot"), COMMANDS, "volley_bot")
+    # Before the username is known the suffix is not checked
+    assert ingest.wants_update(_command("/event_list@other_bot"), COMMANDS)
+
+
+def test_only_handled_update_types_pass():
+    assert ingest.wants_update({"update_id": 1, "callback_query": {"id": "1"}}, COMMANDS)
+    assert not ingest.wants_update(_command("hello"), COMMANDS)
+    assert not ingest.wants_update({"update_id": 1, "poll": {}}, COMMANDS)
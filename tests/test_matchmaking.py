@@ -0,0 +1,46 @@
+from utils.matchmaking import Court, MatchPlayer, solve
+
+
+def _players(skills, courts=()):
+    return [MatchPlayer(id=number, skill=skill, position=None, courts=courts) for number, skill in enumerate(skills, 1)]
+
+
+def _seated(result):
+    return sorted(player for team_a, team_b in result.teams.values() for player in team_a + team_b)
+
+
+def test_courts_are_filled_up_to_capacity():
+    result = solve(_players([5] * 10), [Court("A", 4), Court("B", 6)])
+    assert [len(team_a) + len(team_b) for team_a, team_b in result.teams.values()] == [4, 6]
+    assert _seated(result) == list(range(1, 11))
+    assert result.waitlist == []
+
+
+def test_latest_sign_ups_go_to_the_waitlist_in_order():
+    result = solve(_players([1, 9, 2, 8, 3, 7, 4]), [Court("A", 4)])
+    assert _seated(result) == [1, 2, 3, 4]
+    assert result.waitlist == [5, 6, 7]
+
+
+def test_teams_are_balanced_by_skill():
+    skills = [10, 9, 8, 7, 3, 2, 2, 1]
+    result = solve(_players(skills), [Court("A", 8)])
+    team_a, team_b = result.teams["A"]
+    assert len(team_a) == len(team_b) == 4
+    total = {number: skill for number, skill in enumerate(skills, 1)}
+    assert sum(total[p] for p in team_a) == sum(total[p] for p in team_b) == 21
+    assert result.cost == 0
+
+
+def test_positions_are_split_between_teams():
+    players = [MatchPlayer(number, 5, "setter" if number <= 2 else None, ()) for number in range(1, 7)]
+    team_a, team_b = solve(players, [Court("A", 6)]).teams["A"]
+    assert {1, 2} & set(team_a) and {1, 2} & set(team_b)
+
+
+def test_players_are_moved_to_their_preferred_court():
+    players = _players([5, 5, 5]) + [MatchPlayer(4, 5, None, ("A",))]
+    # Court A is full when player 4 signs up, so a player without a preference makes room
+    result = solve(players, [Court("A", 2), Court("B", 2)])
+    assert 4 in sum(result.teams["A"], [])
+    assert result.cost == 0
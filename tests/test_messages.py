@@ -0,0 +1,48 @@
+import pytest
+
+from tests.handler_cases import CASES, run_update
+from utils.messages import Catalog, load_catalog
+
+
+def test_catalogs_compile_with_matching_placeholders():
+    catalog = load_catalog()
+    assert set(catalog.messages) >= {"en", "ru"}
+    assert set(catalog.messages["ru"]) == set(catalog.messages["en"])
+    # Static texts are rendered once, up front
+    assert catalog.messages["en"]["start.welcome"].startswith("Welcome")
+
+
+def test_language_falls_back_to_the_default():
+    catalog = load_catalog()
+    assert catalog.language("ru") == "ru"
+    assert catalog.language("en-US") == "en"
+    assert catalog.language("de") == "en"
+    assert catalog.language(None) == "en"
+    assert load_catalog(default="ru").language("de") == "ru"
+
+
+@pytest.mark.parametrize("count, text", [(1, "1 час"), (3, "3 часа"), (5, "5 часов"), (11, "11 часов"), (22, "22 часа")])
+def test_russian_plural_forms(count, text):
+    assert load_catalog().render("ru", "reminder.hours", count=count) == text
+
+
+def test_catalog_rejects_unknown_placeholders():
+    with pytest.raises(ValueError):
+        Catalog({"en": {"greeting": "Hi {name}"}, "ru": {"greeting": "Привет, {nick}"}})
+    with pytest.raises(ValueError):
+        Catalog({"en": {"games": {"one": "{count} game", "other": "{count} games"}}, "ru": {"games": {"one": "{count} игра"}}})
+
+
+def test_missing_translations_use_the_default_text():
+    catalog = Catalog({"en": {"hello": "Hello", "bye": "Bye {name}"}, "ru": {"hello": "Привет"}})
+    assert catalog.render("ru", "hello") == "Привет"
+    assert catalog.render("ru", "bye", name="Anna") == "Bye Anna"
+
+
+def test_handlers_reply_in_the_users_language(harness):
+    run_update(harness, CASES["event_join_full"], language_code="ru")
+    run_update(harness, CASES["series_join"], language_code="ru-RU")
+    assert harness.bot.sent == [
+        "Мест больше нет.",
+        "Теперь вы постоянный игрок этой серии и записаны на 4 предстоящие игры.",
+    ]
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from models import Base
+from utils.migrations import MIGRATIONS, migrate
+
+LEGACY_SCHEMA = (
+    "CREATE TABLE players (id INTEGER PRIMARY KEY, telegram_id INTEGER UNIQUE NOT NULL, telegram_handle VARCHAR(100), "
+    "name VARCHAR(100), skill_level INTEGER, preferred_position VARCHAR(50), is_active BOOLEAN, registered_at DATETIME)",
+    "CREATE TABLE events (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, description TEXT, date DATETIME, "
+    "location VARCHAR(255), max_participants INTEGER, created_at DATETIME, is_active BOOLEAN)",
+    "CREATE TABLE event_participants (id INTEGER PRIMARY KEY, event_id INTEGER NOT NULL, player_id INTEGER NOT NULL, joined_at DATETIME)",
+    "INSERT INTO players (id, telegram_id, name) VALUES (1, 5000000001, 'Ann')",
+    "INSERT INTO events (id, name, max_participants, is_active) VALUES (1, 'Sunday', 12, 1)",
+    "INSERT INTO event_participants (event_id, player_id) VALUES (1, 1)",
+)
+
+
+def _schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    assert migrate(migrated) == [migration.version for migration in MIGRATIONS]
+    declared = create_engine(f"sqlite:///{tmp_path / 'declared.db'}")
+    Base.metadata.create_all(declared)
+    # A model change without a migration shows up here
+    assert _schema(migrated) == _schema(declared)
+
+
+def test_legacy_rows_need_a_group(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    monkeypatch.delenv("LEGACY_CHAT_ID", raising=False)
+    with pytest.raises(RuntimeError, match="LEGACY_CHAT_ID"):
+        migrate(engine)
+
+    monkeypatch.setenv("LEGACY_CHAT_ID", "-100")
+    assert migrate(engine) == [7]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT chat_id FROM events")).scalar() == -100
+        assert conn.execute(text("SELECT chat_id, player_id FROM group_members")).all() == [(-100, 1)]
+        assert conn.execute(text("SELECT events_joined FROM player_stats")).scalar() == 1
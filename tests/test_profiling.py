@@ -0,0 +1,100 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from utils import profiling
+from utils.profiling import UpdateProfiler
+
+
+async def _queries(engine, delay=0.0):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    await asyncio.sleep(delay)
+    return "done"
+
+
+def _profiler(tmp_path, **settings):
+    engine = create_engine("sqlite://")
+    profiler = UpdateProfiler(engine, str(tmp_path / "profiles"), **settings)
+    profiler.configure(enabled=True)
+    return profiler, engine
+
+
+def test_disabled_profiler_captures_nothing(tmp_path):
+    engine = create_engine("sqlite://")
+    profiler = UpdateProfiler(engine, str(tmp_path / "profiles"), sample_rate=1.0, threshold=0.0)
+    assert asyncio.run(profiler.run(_queries(engine), "start")) == "done"
+    assert profiler.list() == []
+
+
+def test_slow_updates_are_captured_with_their_statements(tmp_path):
+    profiler, engine = _profiler(tmp_path, threshold=0.02)
+    asyncio.run(profiler.run(_queries(engine), "fast"))
+    assert profiler.list() == []
+
+    assert asyncio.run(profiler.run(_queries(engine, delay=0.03), "event_join")) == "done"
+    [name] = profiler.list()
+    assert name.endswith("-event_join.json")
+    capture = profiler.load(name)
+    assert capture["label"] == "event_join"
+    assert capture["duration_ms"] >= 20
+    assert [statement["sql"] for statement in capture["statements"]] == ["SELECT 1", "SELECT 2"]
+    assert all(statement["ms"] >= 0 for statement in capture["statements"])
+    assert capture["sql_ms"] == round(sum(statement["ms"] for statement in capture["statements"]), 3)
+    assert capture["profile"] is None
+
+
+def test_sample_rate_decides_which_updates_run_under_cprofile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.5)
+    profiler, engine = _profiler(tmp_path, sample_rate=0.4, threshold=0.0)
+    asyncio.run(profiler.run(_queries(engine), "skipped"))
+    profiler.configure(sample_rate=0.6)
+    asyncio.run(profiler.run(_queries(engine), "sampled"))
+
+    captures = {profiler.load(name)["label"]: profiler.load(name) for name in profiler.list()}
+    assert captures["skipped"]["profile"] is None
+    assert "function calls" in captures["sampled"]["profile"]
+
+
+def test_captures_are_rotated(tmp_path):
+    profiler, engine = _profiler(tmp_path, threshold=0.0, keep=3)
+    for i in range(5):
+        asyncio.run(profiler.run(_queries(engine), f"update{i}"))
+    names = profiler.list()
+    assert [name.rsplit("-", 1)[1] for name in names] == ["update4.json", "update3.json", "update2.json"]
+    assert len(list((tmp_path / "profiles").iterdir())) == 3
+
+
+def test_load_rejects_unsafe_names(tmp_path):
+    profiler, engine = _profiler(tmp_path, threshold=0.0)
+    asyncio.run(profiler.run(_queries(engine), "start"))
+    (tmp_path / "secret.json").write_text("{}")
+    (tmp_path / "profiles" / "notes.txt").write_text("")
+
+    assert profiler.load(profiler.list()[0])["label"] == "start"
+    for name in ("../secret.json", "..", "notes.txt", "missing.json", "/etc/passwd"):
+        assert profiler.load(name) is None
+
+
+def test_admin_profiles_need_the_admin_token(deployed_app, monkeypatch):
+    profiler = deployed_app.profiler
+    profiler.configure(enabled=True, threshold=0.0)
+    asyncio.run(profiler.run(_queries(deployed_app.engine), "start"))
+    [name] = profiler.list()
+    client = TestClient(deployed_app.app)
+
+    for headers in ({}, {"X-Admin-Token": "wrong"}):
+        assert client.get("/admin/profiles", headers=headers).status_code == 403
+        assert client.get(f"/admin/profiles/{name}", headers=headers).status_code == 403
+    headers = {"X-Admin-Token": "admin-secret"}
+    response = client.get("/admin/profiles", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["captures"] == [name]
+    assert client.get(f"/admin/profiles/{name}", headers=headers).json()["label"] == "start"
+    assert client.get("/admin/profiles/missing.json", headers=headers).status_code == 404
+
+    # Without a configured token the endpoints stay closed
+    monkeypatch.setattr(deployed_app, "ADMIN_API_TOKEN", None)
+    assert client.get("/admin/profiles", headers=headers).status_code == 403
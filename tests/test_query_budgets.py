@@ -0,0 +1,78 @@
+"""Query-count budgets for the handler paths.
+
+Every command and callback handler runs once against a seeded database
+through the stand-in bot, while SQLAlchemy engine events count the SQL
+statements of the update and a counting cursor counts the rows fetched.
+A handler going over its budget fails the build; lower a budget when a
+change makes a path cheaper, and raise one only with a reason.
+"""
+import ast
+from pathlib import Path
+
+import pytest
+
+from tests.handler_cases import CASES, run_case
+
+# (statements, rows fetched) per update; joins and leaves include the player_stats upsert,
+# series paths post or refresh the roster of each of the series' four upcoming events.
+# Joins, leaves and results hold the event's lock, three statements of their budget.
+# Coordinator locks and shared state (survey progress, pending roster edits, profiling
+# settings) are rows in the same database, as with COORDINATION=database
+BUDGETS = {
+    "start": (0, 0),
+    "register_new": (4, 0),
+    "register_existing": (2, 2),
+    "register_other_group": (3, 1),
+    "survey_answer": (5, 1),
+    "survey_finish": (8, 2),
+    "mydata": (1, 1),
+    "edit_my_data": (0, 0),
+    "event_create": (7, 6),
+    "event_join": (14, 13),
+    "event_join_full": (7, 3),
+    "event_leave": (12, 15),
+    "series_create": (23, 26),
+    "series_join": (41, 46),
+    "event_list": (1, 6),
+    "event_result": (9, 8),
+    "stats": (1, 1),
+    "stats_other": (1, 1),
+    "admin_add": (2, 0),
+    "profiling": (5, 3),
+    "matchmake": (3, 23),
+    "balance_teams": (2, 13),
+}
+
+
+def _registered_handlers():
+    """Names of the handlers module functions bot.py registers with the application."""
+    tree = ast.parse((Path(__file__).resolve().parent.parent / "bot.py").read_text())
+    return {
+        node.attr
+        for call in ast.walk(tree)
+        if isinstance(call, ast.Call) and getattr(call.func, "attr", None) == "add_handler"
+        for node in ast.walk(call)
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "handlers"
+    }
+
+
+def test_every_registered_handler_has_a_case():
+    registered = _registered_handlers()
+    assert "event_join" in registered
+    assert registered <= {case.handler.__name__ for case in CASES.values()}
+
+
+def test_every_case_has_a_budget():
+    assert set(CASES) == set(BUDGETS)
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_handler_query_budget(harness, name):
+    run_case(harness, name)
+
+    statements, rows = BUDGETS[name]
+    counter = harness.counter
+    report = "\n".join(counter.statements)
+    assert len(counter.statements) <= statements, f"{name} ran {len(counter.statements)} statements:\n{report}"
+    assert counter.rows <= rows, f"{name} fetched {counter.rows} rows:\n{report}"
+    assert harness.bot.sent or harness.bot.edited
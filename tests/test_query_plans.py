@@ -0,0 +1,19 @@
+"""Every statement a handler runs must be answered from an index.
+
+The statements of each handler path are explained with EXPLAIN QUERY PLAN
+against the seeded database; a full table or index scan fails the test.
+"""
+import pytest
+
+from tests.handler_cases import CASES, run_case
+from utils.query_audit import StatementRecorder, audit
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_handler_queries_use_indexes(harness, name):
+    with StatementRecorder(harness.engine) as recorder:
+        run_case(harness, name)
+
+    findings = audit(harness.engine, recorder.statements.items())
+    report = "\n\n".join(f"{finding.statement}\n" + "\n".join(finding.plan) for finding in findings)
+    assert not findings, f"{name} scans whole tables:\n{report}"
@@ -0,0 +1,108 @@
+import asyncio
+
+from telegram.error import BadRequest
+
+from models import EventParticipant
+from tests.fakes import FakeBot
+from utils.coordination import LocalCoordinator
+from utils.roster import RosterUpdater
+
+
+def _leave(harness, event_id, count):
+    """Removes the last `count` participants of an event, as /event_leave would."""
+    session = harness.Session()
+    rows = session.query(EventParticipant).filter_by(event_id=event_id).order_by(EventParticipant.id.desc()).limit(count)
+    for participant in rows.all():
+        session.delete(participant)
+    session.commit()
+    session.close()
+
+
+def test_changes_inside_the_delay_make_one_edit(harness):
+    bot = FakeBot()
+    roster = RosterUpdater(bot, harness.Session, delay=0.05, min_interval=0)
+    event_id = harness.ids["full"]
+
+    async def scenario():
+        for _ in range(3):
+            _leave(harness, event_id, 1)
+            roster.schedule(event_id)
+        assert roster.pending == {event_id}
+        await asyncio.sleep(0.15)
+
+    asyncio.run(scenario())
+    assert roster.pending == set()
+    assert roster.edits == 1
+    assert bot.edited[0].splitlines()[1] == "Players: 9/12"
+
+
+def test_flush_sends_pending_edits_at_once(harness):
+    bot = FakeBot()
+    roster = RosterUpdater(bot, harness.Session, delay=60)
+
+    async def scenario():
+        roster.schedule(harness.ids["full"])
+        roster.schedule(harness.ids["open"])
+        await roster.flush()
+
+    asyncio.run(scenario())
+    assert roster.pending == set()
+    assert [text.splitlines()[0].split(" (")[0] for text in bot.edited] == ["Court 1", "Court 2"]
+
+
+def test_edits_keep_the_minimum_interval(harness):
+    bot = FakeBot()
+    roster = RosterUpdater(bot, harness.Session, delay=0.01, min_interval=0.3)
+    event_id = harness.ids["full"]
+
+    async def scenario():
+        roster.schedule(event_id)
+        await asyncio.sleep(0.05)
+        assert roster.edits == 1
+        roster.schedule(event_id)
+        await asyncio.sleep(0.1)
+        # Still inside the interval since the first edit
+        assert roster.edits == 1
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+    assert roster.edits == 2
+
+
+def test_workers_fold_changes_into_one_edit(harness):
+    coordinator = LocalCoordinator()
+    bots = [FakeBot(), FakeBot()]
+    workers = [RosterUpdater(bot, harness.Session, coordinator, delay=60) for bot in bots]
+    event_id = harness.ids["full"]
+
+    async def scenario():
+        workers[0].schedule(event_id)
+        _leave(harness, event_id, 2)
+        # The second worker's change is shown by the first worker's pending edit
+        workers[1].schedule(event_id)
+        assert workers[1].pending == set()
+        await workers[0].flush()
+        # Once that edit started, a new change needs an edit of its own
+        workers[1].schedule(event_id)
+        assert workers[1].pending == {event_id}
+        await workers[1].flush()
+
+    asyncio.run(scenario())
+    assert len(bots[0].edited) == len(bots[1].edited) == 1
+    assert bots[0].edited[0].splitlines()[1] == "Players: 10/12"
+
+
+def test_unchanged_roster_is_not_an_error(harness):
+    class UnchangedBot(FakeBot):
+        async def edit_message_text(self, text, **kwargs):
+            raise BadRequest("Message is not modified")
+
+    roster = RosterUpdater(UnchangedBot(), harness.Session, delay=60)
+
+    async def scenario():
+        roster.schedule(harness.ids["full"])
+        await roster.flush()
+
+    asyncio.run(scenario())
+    assert roster.edits == 0
+    assert roster.pending == set()
@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from models import Event, ScheduledJob
+from tests.fakes import FakeBot
+from tests.handler_cases import GAME_DATE
+from utils import scheduler as scheduler_module
+from utils.scheduler import JobScheduler, event_job_rows, schedule_event_jobs
+
+
+class SlowBot(FakeBot):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.delay)
+        return await super().send_message(chat_id, text, **kwargs)
+
+
+def _schedule(harness, *names, now=None):
+    """Replaces the seeded jobs with the reminder and close jobs of the named events."""
+    session = harness.Session()
+    session.query(ScheduledJob).delete()
+    for name in names:
+        schedule_event_jobs(session, session.get(Event, harness.ids[name]), now or GAME_DATE - timedelta(days=2))
+    session.commit()
+    session.close()
+
+
+def _pending(harness):
+    session = harness.Session()
+    jobs = session.query(ScheduledJob.kind, ScheduledJob.due_at).order_by(ScheduledJob.due_at).all()
+    session.close()
+    return jobs
+
+
+def test_event_job_rows_leave_out_past_reminders():
+    now = datetime(2024, 5, 1, 12)
+    rows = event_job_rows(7, now + timedelta(days=2), now)
+    assert [(row["kind"], row["due_at"]) for row in rows] == [
+        ("reminder", now + timedelta(days=1)),
+        ("reminder", now + timedelta(days=2, hours=-2)),
+        ("close", now + timedelta(days=2, hours=3)),
+    ]
+    rows = event_job_rows(7, now + timedelta(hours=3), now)
+    assert [row["kind"] for row in rows] == ["reminder", "close"]
+    assert all(row["event_id"] == 7 for row in rows)
+
+
+def test_run_due_claims_jobs_once(harness):
+    _schedule(harness, "full")
+    scheduler = harness.bot_data["scheduler"]
+    now = GAME_DATE - timedelta(hours=1)
+
+    # Both reminders are due; the event gets one message naming its players
+    assert asyncio.run(scheduler.run_due(now)) == {"reminders": 1, "closed": 0, "occurrences": 0}
+    assert len(harness.bot.sent) == 1
+    assert "Court 1" in harness.bot.sent[0] and "@player0" in harness.bot.sent[0]
+    assert [kind for kind, _ in _pending(harness)] == ["close"]
+    assert asyncio.run(scheduler.run_due(now)) == {"reminders": 0, "closed": 0, "occurrences": 0}
+    assert len(harness.bot.sent) == 1
+
+
+def test_run_due_closes_events_without_reminding(harness):
+    _schedule(harness, "full")
+    scheduler = harness.bot_data["scheduler"]
+
+    assert asyncio.run(scheduler.run_due(GAME_DATE + timedelta(hours=4))) == {"reminders": 0, "closed": 1, "occurrences": 0}
+    assert harness.bot.sent == []
+    assert _pending(harness) == []
+    session = harness.Session()
+    assert not session.get(Event, harness.ids["full"]).is_active
+    session.close()
+
+
+def test_reminders_are_batched_across_events(harness):
+    scheduler = harness.bot_data["scheduler"]
+    now = GAME_DATE - timedelta(hours=1)
+
+    _schedule(harness, "full")
+    harness.counter.reset()
+    asyncio.run(scheduler.run_due(now))
+    one_event = len(harness.counter.statements)
+
+    _schedule(harness, "full", "open")
+    harness.counter.reset()
+    assert asyncio.run(scheduler.run_due(now))["reminders"] == 2
+    assert len(harness.counter.statements) == one_event
+    assert sorted("Court 1" in text for text in harness.bot.sent[-2:]) == [False, True]
+
+
+def test_series_jobs_refill_the_series(harness):
+    session = harness.Session()
+    refill = session.query(ScheduledJob).filter_by(kind="series").one()
+    due_at = refill.due_at
+    before = session.query(Event).filter_by(series_id=harness.ids["series"]).count()
+    session.close()
+    scheduler = harness.bot_data["scheduler"]
+
+    result = asyncio.run(scheduler.run_due(due_at))
+    assert result["occurrences"] > 0
+    session = harness.Session()
+    assert session.query(Event).filter_by(series_id=harness.ids["series"]).count() == before + result["occurrences"]
+    next_refill = session.query(ScheduledJob).filter_by(kind="series").one()
+    session.close()
+    assert next_refill.due_at > due_at
+    # The new events are on the timer and get their roster message
+    assert (next_refill.due_at, next_refill.id) in scheduler._heap
+    assert sum(text.startswith("Tuesdays (") for text in harness.bot.sent) == result["occurrences"]
+
+
+def test_heap_is_reloaded_from_the_table(harness):
+    _schedule(harness, "full", "open")
+    restarted = JobScheduler(harness.bot, harness.Session)
+    assert restarted.load() == 6
+    assert restarted._heap[0][0] == min(due_at for _, due_at in _pending(harness))
+
+
+def test_failed_run_is_retried(harness, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "RETRY_SECONDS", 0.01)
+    _schedule(harness, "full")
+    scheduler = harness.bot_data["scheduler"]
+    scheduler.clock = lambda: GAME_DATE - timedelta(hours=1)
+    run_due = scheduler.run_due
+    calls = []
+
+    async def flaky(now=None):
+        calls.append(now)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return await run_due(now)
+
+    scheduler.run_due = flaky
+
+    async def scenario():
+        scheduler.start()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if harness.bot.sent:
+                break
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert len(harness.bot.sent) == 1
+    assert [kind for kind, _ in _pending(harness)] == ["close"]
+
+
+def _stop_while_sending(harness, delay, timeout):
+    _schedule(harness, "full")
+    bot = SlowBot(delay)
+    scheduler = JobScheduler(bot, harness.Session, clock=lambda: GAME_DATE - timedelta(hours=1))
+
+    async def scenario():
+        scheduler.start()
+        while scheduler._unsent == 0:
+            await asyncio.sleep(0.001)
+        return await scheduler.stop(timeout)
+
+    return asyncio.run(scenario()), bot
+
+
+def test_stop_lets_reminders_in_flight_finish(harness):
+    unsent, bot = _stop_while_sending(harness, delay=0.05, timeout=5)
+    assert unsent == 0
+    assert len(bot.sent) == 1
+
+
+def test_stop_reports_reminders_it_had_to_cancel(harness):
+    unsent, bot = _stop_while_sending(harness, delay=5, timeout=0.05)
+    assert unsent == 1
+    assert bot.sent == []
+
+
+def test_cron_tick_runs_on_the_deployed_app(deployed_app):
+    session = deployed_app.Session()
+    event = Event(chat_id=-100, name="Friday", date=datetime.utcnow() - timedelta(hours=4))
+    session.add(event)
+    session.flush()
+    event_id = event.id
+    session.add(ScheduledJob(event_id=event_id, kind="close", due_at=datetime.utcnow() - timedelta(hours=1)))
+    session.commit()
+    session.close()
+    client = TestClient(deployed_app.app)
+
+    assert client.get("/cron/tick").status_code == 403
+    assert client.get("/cron/tick", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/cron/tick", headers={"Authorization": "Bearer cron-secret"})
+    assert response.status_code == 200
+    assert response.json() == {"reminders": 0, "closed": 1, "occurrences": 0}
+
+    session = deployed_app.Session()
+    assert session.query(ScheduledJob).count() == 0
+    assert not session.get(Event, event_id).is_active
+    session.close()
+
+
+def test_cron_tick_needs_a_configured_secret(deployed_app, monkeypatch):
+    monkeypatch.setattr(deployed_app, "CRON_SECRET", None)
+    client = TestClient(deployed_app.app)
+    assert client.get("/cron/tick", headers={"Authorization": "Bearer "}).status_code == 403
+    assert client.get("/cron/tick", headers={"Authorization": "Bearer None"}).status_code == 403
@@ -0,0 +1,47 @@
+import asyncio
+
+import handlers
+from models import Event, EventParticipant
+from tests.fakes import make_context, make_update
+from tests.handler_cases import CHAT_ID, NEWCOMER_ID, run_case
+from utils.series import upcoming_events
+
+
+def test_series_events_get_a_roster(harness):
+    run_case(harness, "series_create")
+    session = harness.Session()
+    events = session.query(Event).filter_by(name="Thursdays").all()
+    session.close()
+    assert events and all(event.roster_message_id for event in events)
+    assert sum(text.startswith("Thursdays (") for text in harness.bot.sent) == len(events)
+
+
+def test_series_join_waits_for_event_joins(harness):
+    coordinator = harness.bot_data["coordinator"]
+    session = harness.Session()
+    event_ids = upcoming_events(session, harness.ids["series"])
+    session.close()
+
+    def joined():
+        session = harness.Session()
+        count = session.query(EventParticipant).filter(EventParticipant.event_id.in_(event_ids)).count()
+        session.close()
+        return count
+
+    before = joined()
+
+    async def scenario():
+        update = make_update(CHAT_ID, NEWCOMER_ID, bot=harness.bot)
+        context = make_context(harness.bot, harness.bot_data, [str(harness.ids["series"])])
+        # An /event_join in progress on one of the series' games
+        async with coordinator.lock(f"event:{event_ids[-1]}"):
+            task = asyncio.ensure_future(handlers.series_join(update, context, harness.engine, harness.Session))
+            await asyncio.sleep(0.05)
+            assert not task.done()
+            assert joined() == before
+        await task
+        assert harness.bot_data["roster_updater"].pending == set(event_ids)
+        await harness.bot_data["roster_updater"].flush()
+
+    asyncio.run(scenario())
+    assert joined() == before + len(event_ids)
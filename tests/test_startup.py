@@ -0,0 +1,48 @@
+import asyncio
+
+from telegram import Bot, Update, User
+from telegram.ext import CommandHandler
+
+from startup import build_application
+
+
+class OfflineBot(Bot):
+    async def get_me(self, *args, **kwargs):
+        self._bot_user = User(id=1, first_name="Volley", is_bot=True, username="volley_bot")
+        return self._bot_user
+
+
+def test_persistence_keeps_services_in_bot_data(tmp_path):
+    path = tmp_path / "state.pickle"
+    application = build_application(OfflineBot("123:abc"), str(path))
+    roster = object()
+    application.bot_data["roster_updater"] = roster
+
+    async def survey(update, context):
+        context.user_data["survey"] = {"question": 2}
+
+    application.add_handler(CommandHandler("survey", survey))
+    message = {
+        "message_id": 1, "date": 0, "text": "/survey",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 7}],
+        "from": {"id": 7, "is_bot": False, "first_name": "Ann"},
+        "chat": {"id": 7, "type": "private"},
+    }
+
+    async def scenario():
+        await application.initialize()
+        assert application.bot_data["roster_updater"] is roster
+        await application.process_update(Update.de_json({"update_id": 1, "message": message}, application.bot))
+        await application.shutdown()
+
+    asyncio.run(scenario())
+    assert path.exists()
+
+    restored = build_application(OfflineBot("123:abc"), str(path))
+
+    async def reload():
+        await restored.initialize()
+        await restored.shutdown()
+
+    asyncio.run(reload())
+    assert restored.user_data[7] == {"survey": {"question": 2}}
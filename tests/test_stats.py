@@ -0,0 +1,94 @@
+import asyncio
+
+from sqlalchemy import select
+
+from handlers import _text
+from models import PlayerStats
+from tests.fakes import make_context, make_update
+from tests.handler_cases import CASES, CHAT_ID, MEMBER_ID, run_case, run_update
+from utils import stats
+
+
+def _snapshot(conn):
+    columns = [getattr(PlayerStats, column) for column in stats.COUNTERS + ("form",)]
+    rows = conn.execute(select(PlayerStats.player_id, *columns).order_by(PlayerStats.player_id)).all()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def test_incremental_totals_match_a_rebuild(harness):
+    for name in ("event_join", "event_leave", "series_join", "event_result"):
+        run_case(harness, name)
+    # A corrected result moves the players between counters
+    run_update(harness, CASES["event_result"]._replace(args=("{played}", "loss", "@player2")))
+
+    with harness.engine.begin() as conn:
+        incremental = _snapshot(conn)
+        stats.rebuild(conn, batch_size=7)
+        rebuilt = _snapshot(conn)
+    assert incremental == rebuilt
+    assert incremental[3][stats.COUNTERS.index("losses")] == 1
+
+
+def test_rebuild_keeps_the_latest_results_in_form(harness):
+    with harness.engine.begin() as conn:
+        stats.rebuild(conn, batch_size=2)
+        form = dict(conn.execute(select(PlayerStats.player_id, PlayerStats.form)).all())
+    assert form[1] == "W"
+    assert form[2] == "L"
+    assert form[3] == ""
+
+
+def _run_together(harness, case, times=2):
+    """Handles the same update `times` times concurrently."""
+    context = make_context(harness.bot, harness.bot_data, [arg.format(**harness.ids) for arg in case.args])
+
+    async def scenario():
+        await asyncio.gather(*(
+            case.handler(make_update(case.chat_id, case.user, bot=harness.bot), context, harness.engine, harness.Session)
+            for _ in range(times)
+        ))
+        await harness.bot_data["roster_updater"].flush()
+
+    asyncio.run(scenario())
+
+
+def _matches_rebuild(harness):
+    with harness.engine.begin() as conn:
+        incremental = _snapshot(conn)
+        stats.rebuild(conn)
+        return incremental == _snapshot(conn)
+
+
+def test_repeated_leave_is_counted_once(harness):
+    _run_together(harness, CASES["event_leave"])
+    assert _matches_rebuild(harness)
+    assert harness.bot.sent.count(_text(make_update(CHAT_ID, MEMBER_ID), "event_leave.not_participating")) == 1
+
+
+def test_repeated_result_is_counted_once(harness):
+    _run_together(harness, CASES["event_result"]._replace(args=("{played}", "loss", "@player0", "@player1")))
+    assert _matches_rebuild(harness)
+
+
+def test_leave_and_result_wait_for_the_event_lock(harness):
+    coordinator = harness.bot_data["coordinator"]
+    cases = [CASES["event_leave"], CASES["event_result"]._replace(args=("{full}", "win", "@player0"))]
+
+    async def scenario():
+        async with coordinator.lock(f"event:{harness.ids['full']}"):
+            tasks = [
+                asyncio.ensure_future(case.handler(
+                    make_update(case.chat_id, case.user, bot=harness.bot),
+                    make_context(harness.bot, harness.bot_data, [arg.format(**harness.ids) for arg in case.args]),
+                    harness.engine,
+                    harness.Session,
+                ))
+                for case in cases
+            ]
+            await asyncio.sleep(0.05)
+            assert not any(task.done() for task in tasks)
+        await asyncio.gather(*tasks)
+        await harness.bot_data["roster_updater"].flush()
+
+    asyncio.run(scenario())
+    assert _matches_rebuild(harness)
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from pathlib import Path
+
+from benchmarks.survey_sim import simulate
+from handlers import _process_callback_query
+from tests.fakes import make_context, make_update
+from tests.handler_cases import CHAT_ID, MEMBER_ID, NEWCOMER_ID
+from utils.survey import bank_from_json
+
+
+def _bank():
+    with open(Path(__file__).resolve().parent.parent / "data" / "initial_data.json") as f:
+        return bank_from_json(json.load(f))
+
+
+def _calls(result):
+    """Messages and handler calls per registration: one of each per question, plus the closing message."""
+    return round(2 * result["mean_questions"] + 1, 1)
+
+
+def test_adaptive_survey_stays_close_to_the_full_one():
+    bank = _bank()
+    result = simulate(bank, players=500, seed=0)
+    # The numbers stated for SURVEY_TOLERANCE in the README
+    assert 2 * len(bank) + 1 == 15
+    assert _calls(result) == 10.7
+    assert result["rank_vs_full"] >= 0.985
+    assert result["adaptive_rank_vs_level"] >= result["full_rank_vs_level"] - 0.02
+    assert result["mean_error"] <= 0.04 * bank.total_range
+    assert result["max_error"] <= 6
+
+
+def test_looser_tolerance_halves_the_calls_at_a_cost():
+    result = simulate(_bank(), players=500, seed=0, tolerance=0.08)
+    assert _calls(result) == 7.2
+    assert round(result["mean_error"], 1) == 2.1
+    assert round(result["rank_vs_full"], 2) == 0.97
+
+
+def _press(harness, telegram_id, option_id, message_id):
+    update = make_update(CHAT_ID, telegram_id, callback_data=str(option_id), bot=harness.bot, message_id=message_id)
+    context = make_context(harness.bot, harness.bot_data)
+    asyncio.run(_process_callback_query(update, context, harness.engine, harness.Session))
+
+
+def test_presses_on_other_questions_only_alert(harness):
+    coordinator = harness.bot_data["coordinator"]
+    question = harness.bot_data["survey_bank"].questions[0]
+    option = question.options[0].id
+    coordinator.set_state(f"survey:{MEMBER_ID}", {"current_question": question.id, "message_id": 5, "responses": {}})
+    coordinator.set_state(f"survey:{NEWCOMER_ID}", {"current_question": question.id, "message_id": 7, "responses": {}})
+
+    # Another user in the same survey step, and a user with no survey at all, press the member's question
+    _press(harness, NEWCOMER_ID, option, 5)
+    _press(harness, NEWCOMER_ID + 1, option, 5)
+    assert harness.bot.alerts == ["This question is not waiting for your answer."] * 2
+    assert harness.bot.edited == [] and harness.bot.sent == []
+    assert coordinator.get_state(f"survey:{NEWCOMER_ID}")["responses"] == {}
+
+    _press(harness, MEMBER_ID, option, 5)
+    state = coordinator.get_state(f"survey:{MEMBER_ID}")
+    assert state["responses"] == {str(question.id): option}
+    assert state["message_id"] != 5
+    # The answered question's keyboard is now stale
+    _press(harness, MEMBER_ID, option, 5)
+    assert len(harness.bot.alerts) == 3
@@ -0,0 +1,54 @@
+from utils.coordination import LocalCoordinator
+from utils.throttle import UpdateThrottle
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _command(user_id, chat_id, text="/event_list"):
+    return {"update_id": 1, "message": {"text": text, "from": {"id": user_id}, "chat": {"id": chat_id}}}
+
+
+def test_user_bucket_limits_one_user():
+    clock = Clock()
+    throttle = UpdateThrottle("*=1/2", "*=100/100", clock=clock)
+    assert [throttle.allow(_command(7, -100)) for _ in range(3)] == [True, True, False]
+    assert throttle.allow(_command(8, -100))
+    clock.now += 1
+    assert throttle.allow(_command(7, -100))
+    assert throttle.stats()["dropped"] == {"user:event_list": 1}
+
+
+def test_updates_dropped_by_the_chat_bucket_cost_the_user_nothing():
+    clock = Clock()
+    throttle = UpdateThrottle("*=1/2", "*=1/1", clock=clock)
+    assert throttle.allow(_command(7, -100))
+    # The busy chat rejects these; user 7 keeps the token for another chat
+    assert not throttle.allow(_command(7, -100))
+    assert not throttle.allow(_command(7, -100))
+    assert throttle.allow(_command(7, -200))
+    assert throttle.stats()["dropped"] == {"chat:event_list": 2}
+
+
+def test_dropped_counts_are_summed_across_workers():
+    clock = Clock()
+    coordinator = LocalCoordinator()
+    workers = [UpdateThrottle("*=1/1", "*=100/100", clock=clock) for _ in range(2)]
+    for worker in workers:
+        worker.allow(_command(7, -100))
+        worker.allow(_command(7, -100))
+        worker.publish(coordinator)
+    workers[0].allow(_command(7, -100))
+    # Published again only once the interval has passed
+    workers[0].publish(coordinator, interval=5)
+    assert workers[1].stats(coordinator)["dropped"] == {"user:event_list": 2}
+    clock.now += 5
+    workers[0].allow(_command(8, -100))
+    workers[0].allow(_command(8, -100))
+    workers[0].publish(coordinator, interval=5)
+    assert workers[1].stats(coordinator)["dropped"] == {"user:event_list": 4}
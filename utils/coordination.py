@@ -0,0 +1,301 @@
+import abc
+import asyncio
+import contextlib
+import json
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from models import CacheInvalidation, CoordinationCounter, CoordinationLock, SharedState
+from utils.db import upsert
+
+logger = logging.getLogger(__name__)
+
+
+class LockTimeout(Exception):
+    """Raised when a coordination lock could not be acquired in time."""
+
+
+class Coordinator(abc.ABC):
+    """State shared by every worker serving the bot.
+
+    Provides named locks (held per event or per user around check-then-write
+    sequences), shared counters such as the throttle's dropped updates,
+    small JSON state values such as survey progress, pending roster edits
+    and profiling settings, and cache invalidation messages delivered to
+    every worker. Throttle buckets and profile captures stay per process.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)
+
+    @abc.abstractmethod
+    def lock(self, name, timeout=10.0):
+        """Async context manager holding the named lock across all workers."""
+
+    @abc.abstractmethod
+    def incr(self, name, amount=1):
+        """Adds to a shared counter and returns the new value."""
+
+    @abc.abstractmethod
+    def counter(self, name):
+        """Returns the value of a shared counter, 0 if it was never incremented."""
+
+    @abc.abstractmethod
+    def counters(self, prefix):
+        """Returns {name: value} of the shared counters whose name starts with `prefix`."""
+
+    @abc.abstractmethod
+    def get_state(self, key):
+        """Returns the JSON value stored under `key`, or None."""
+
+    @abc.abstractmethod
+    def set_state(self, key, value):
+        """Stores a JSON-serializable value under `key`."""
+
+    @abc.abstractmethod
+    def delete_state(self, key):
+        """Removes the value stored under `key`, if any."""
+
+    @abc.abstractmethod
+    def invalidate(self, key):
+        """Tells every worker, this one included, to drop its cached copy of `key`."""
+
+    def subscribe(self, key, callback):
+        """Registers a callback run in each worker when `key` is invalidated."""
+        self._subscribers[key].append(callback)
+
+    def _notify(self, key):
+        for callback in self._subscribers.get(key, ()):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Cache invalidation callback for {key} failed: {e}")
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class LocalCoordinator(Coordinator):
+    """In-memory coordinator for a single process and for tests."""
+
+    def __init__(self):
+        super().__init__()
+        self._locks = {}  # name -> [lock, number of holders and waiters]
+        self._counters = defaultdict(int)
+        self._state = {}
+
+    @contextlib.asynccontextmanager
+    async def lock(self, name, timeout=10.0):
+        entry = self._locks.setdefault(name, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            try:
+                await asyncio.wait_for(entry[0].acquire(), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise LockTimeout(name)
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[name]
+
+    def incr(self, name, amount=1):
+        self._counters[name] += amount
+        return self._counters[name]
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def counters(self, prefix):
+        return {name: value for name, value in self._counters.items() if name.startswith(prefix)}
+
+    def get_state(self, key):
+        value = self._state.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_state(self, key, value):
+        # Stored as JSON so both implementations round-trip values the same way
+        self._state[key] = json.dumps(value)
+
+    def delete_state(self, key):
+        self._state.pop(key, None)
+
+    def invalidate(self, key):
+        self._notify(key)
+
+
+class DatabaseCoordinator(Coordinator):
+    """Coordinator backed by the bot's SQL database (SQLite or Postgres).
+
+    Locks are lease rows in coordination_locks: acquiring one is an INSERT
+    that fails while another worker holds an unexpired lease. The holder
+    renews the lease every third of its length, so a lock is only taken
+    over once its holder stopped renewing it, e.g. because it crashed.
+    Invalidations are appended to cache_invalidations and picked up by
+    every worker's polling task.
+    """
+
+    def __init__(self, engine, lease=30.0, poll_interval=1.0, retention=timedelta(hours=1)):
+        super().__init__()
+        self.engine = engine
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._last_invalidation = None
+        self._task = None
+
+    def _try_acquire(self, name, owner):
+        now = datetime.utcnow()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    delete(CoordinationLock).where(CoordinationLock.name == name, CoordinationLock.expires_at < now)
+                )
+                conn.execute(
+                    insert(CoordinationLock).values(name=name, owner=owner, expires_at=now + timedelta(seconds=self.lease))
+                )
+            return True
+        except (IntegrityError, OperationalError):
+            # Held by someone else, or the database is busy with a competing write
+            return False
+
+    def _release(self, name, owner):
+        with self.engine.begin() as conn:
+            conn.execute(delete(CoordinationLock).where(CoordinationLock.name == name, CoordinationLock.owner == owner))
+
+    async def _renew(self, name, owner):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(CoordinationLock)
+                        .where(CoordinationLock.name == name, CoordinationLock.owner == owner)
+                        .values(expires_at=datetime.utcnow() + timedelta(seconds=self.lease))
+                    )
+            except OperationalError as e:
+                # Retried at the next interval, well before the lease runs out
+                logger.warning(f"Could not renew lock {name}: {e}")
+
+    @contextlib.asynccontextmanager
+    async def lock(self, name, timeout=10.0):
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        delay = 0.005
+        while not self._try_acquire(name, owner):
+            if time.monotonic() > deadline:
+                raise LockTimeout(name)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        renewal = asyncio.ensure_future(self._renew(name, owner))
+        try:
+            yield
+        finally:
+            renewal.cancel()
+            self._release(name, owner)
+
+    def incr(self, name, amount=1):
+        statement = upsert(self.engine.dialect, CoordinationCounter).values(name=name, value=amount)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CoordinationCounter.name],
+            set_={"value": CoordinationCounter.value + amount},
+        ).returning(CoordinationCounter.value)
+        with self.engine.begin() as conn:
+            return conn.execute(statement).scalar()
+
+    def counter(self, name):
+        with self.engine.connect() as conn:
+            value = conn.execute(select(CoordinationCounter.value).where(CoordinationCounter.name == name)).scalar()
+        return value or 0
+
+    def counters(self, prefix):
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(CoordinationCounter.name, CoordinationCounter.value)
+                .where(CoordinationCounter.name.startswith(prefix, autoescape=True))
+            ).all()
+        return dict(rows)
+
+    def get_state(self, key):
+        with self.engine.connect() as conn:
+            value = conn.execute(select(SharedState.value).where(SharedState.key == key)).scalar()
+        return json.loads(value) if value is not None else None
+
+    def set_state(self, key, value):
+        now = datetime.utcnow()
+        statement = upsert(self.engine.dialect, SharedState).values(key=key, value=json.dumps(value), updated_at=now)
+        statement = statement.on_conflict_do_update(
+            index_elements=[SharedState.key],
+            set_={"value": statement.excluded.value, "updated_at": now},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement)
+
+    def delete_state(self, key):
+        with self.engine.begin() as conn:
+            conn.execute(delete(SharedState).where(SharedState.key == key))
+
+    def invalidate(self, key):
+        if self._last_invalidation is None:
+            self.poll()
+        with self.engine.begin() as conn:
+            conn.execute(insert(CacheInvalidation).values(key=key, created_at=datetime.utcnow()))
+        self.poll()
+
+    def poll(self):
+        """Runs callbacks for invalidations published since the last poll."""
+        with self.engine.connect() as conn:
+            if self._last_invalidation is None:
+                # Start from the current end; a fresh worker has nothing cached yet
+                self._last_invalidation = conn.execute(select(func.max(CacheInvalidation.id))).scalar() or 0
+                return
+            rows = conn.execute(
+                select(CacheInvalidation.id, CacheInvalidation.key)
+                .where(CacheInvalidation.id > self._last_invalidation)
+                .order_by(CacheInvalidation.id)
+            ).all()
+        for row in rows:
+            self._last_invalidation = row.id
+        for key in {row.key for row in rows}:
+            self._notify(key)
+
+    def _prune(self):
+        with self.engine.begin() as conn:
+            conn.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < datetime.utcnow() - self.retention))
+
+    async def start(self):
+        self.poll()
+        self._task = asyncio.ensure_future(self._poll_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll_loop(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self.poll()
+                polls += 1
+                if polls % 600 == 0:
+                    self._prune()
+            except Exception as e:
+                logger.error(f"Cache invalidation poll failed: {e}")
@@ -1,7 +1,19 @@
 import json
+import os
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
-from models import Base, Question, QuestionOption
+from models import Question, QuestionOption
+
+# Same database the bot uses when there is no config file
+DEFAULT_CONFIG = {"database": {"dialect": "sqlite", "name": "volleybot.db"}}
+
+def load_config(path="config.json"):
+    """Reads the database configuration file, falling back to DEFAULT_CONFIG."""
+    if not os.path.exists(path):
+        return DEFAULT_CONFIG
+    with open(path) as f:
+        return json.load(f)
 
 def create_db_engine(config):
     """Creates a database engine based on the configuration."""
@@ -13,6 +25,12 @@ def create_db_session(engine):
     """Creates a database session."""
     return sessionmaker(bind=engine)
 
+def upsert(dialect, table):
+    """INSERT ... ON CONFLICT for the dialect; SQLite and Postgres are supported."""
+    if dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
 def load_questions(session, questions_file="data/initial_data.json"):
     """Loads questions from a JSON file into the database."""
     with open(questions_file, 'r') as f:
@@ -21,7 +39,7 @@ def load_questions(session, questions_file="data/initial_data.json"):
     for q_data in questions_data['questions']:
         question = Question(question_text=q_data['question_text'], question_weight=q_data['question_weight'])
         for option_data in q_data['options']:
-            option = QuestionOption(question_text=option_data['option_text'], response_points=option_data['response_points'])
+            option = QuestionOption(option_text=option_data['option_text'], response_points=option_data['response_points'])
             question.options.append(option)
         session.add(question)
 
@@ -29,6 +47,7 @@ def load_questions(session, questions_file="data/initial_data.json"):
     return
     
 def init_db(engine):
-    """Initializes the database by creating the tables."""
-    Base.metadata.create_all(engine)
-    # load_questions(engine) # questions are loaded by alembic migration instead
+    """Brings the database schema up to date and loads the survey questions into a new database."""
+    from utils.migrations import migrate  # utils.migrations imports this module
+
+    return migrate(engine)
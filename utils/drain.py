@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import signal
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DrainController:
+    """Tracks in-flight webhook requests so shutdown can wait for them.
+
+    Once draining starts, new requests are refused (the webhook answers 503
+    and Telegram redelivers the update to the next instance) while requests
+    already running are allowed to finish.
+
+    uvicorn stops accepting connections and waits for running requests
+    before the lifespan shutdown event, so draining has to start when the
+    server receives its exit signal: install_signal_handlers() hooks that.
+    """
+
+    def __init__(self):
+        self.accepting = True
+        self.in_flight = 0
+        self.rejected = 0
+        # Created inside the running loop; on Python 3.9 an Event binds to the loop current at creation
+        self._idle = None
+
+    def enter(self):
+        """Registers a new request; returns False when draining."""
+        if not self.accepting:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def exit(self):
+        """Marks a request registered with enter() as finished."""
+        self.in_flight -= 1
+        if self.in_flight == 0 and self._idle is not None:
+            self._idle.set()
+
+    def stop_accepting(self):
+        if self.accepting:
+            logger.info(f"Draining: refusing new updates, {self.in_flight} in flight")
+        self.accepting = False
+
+    def install_signal_handlers(self, signals=(signal.SIGINT, signal.SIGTERM)):
+        """Starts draining as soon as the process is told to exit, then runs the server's own handler.
+
+        Call from the lifespan startup event, after the server installed its
+        handlers. Returns False when there is nothing to chain to, e.g. when
+        the server does not handle signals in this process.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return False
+        installed = False
+        for sig in signals:
+            previous = signal.getsignal(sig)
+            if not callable(previous):
+                continue
+
+            def handler(signum, frame, previous=previous):
+                self.stop_accepting()
+                previous(signum, frame)
+
+            signal.signal(sig, handler)
+            installed = True
+        return installed
+
+    async def drain(self, deadline):
+        """Stops accepting requests and waits up to `deadline` seconds for running ones.
+
+        Returns the number of requests still running when the deadline passed.
+        """
+        self.stop_accepting()
+        if self.in_flight:
+            self._idle = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=deadline)
+            except asyncio.TimeoutError:
+                logger.warning(f"Drain deadline of {deadline}s passed with {self.in_flight} update(s) in flight")
+        return self.in_flight
@@ -0,0 +1,86 @@
+import hmac
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None
+
+# Update types the bot registers handlers for; also passed to set_webhook
+ALLOWED_UPDATES = ["message", "edited_message", "callback_query"]
+
+DEFAULT_MAX_BODY_BYTES = 256 * 1024
+
+
+class BodyTooLarge(Exception):
+    """Raised when a webhook request body exceeds the size limit."""
+
+
+def loads(body):
+    """Parses a JSON request body straight from bytes."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def parse_update(body):
+    """Parses a webhook body into an update dict; returns None if it is not a JSON object."""
+    try:
+        data = loads(body)
+    except ValueError:  # json and orjson decode errors are both ValueErrors
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def secret_matches(header_value, secret):
+    """Compares the X-Telegram-Bot-Api-Secret-Token header in constant time."""
+    if not secret:
+        return True
+    return header_value is not None and hmac.compare_digest(header_value.encode(), secret.encode())
+
+
+async def read_body(request, limit=DEFAULT_MAX_BODY_BYTES):
+    """Reads a request body, giving up as soon as it grows past `limit` bytes."""
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > limit:
+        raise BodyTooLarge(f"Declared body of {length} bytes exceeds {limit}")
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge(f"Body exceeds {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def registered_commands(application):
+    """Collects the command names of every CommandHandler on the application."""
+    commands = set()
+    for group in application.handlers.values():
+        for handler in group:
+            commands.update(getattr(handler, "commands", ()))
+    return frozenset(commands)
+
+
+def wants_update(data, commands, bot_username=None):
+    """Tells whether any handler would act on a raw update dict.
+
+    Only known commands and callback queries reach the handlers; plain chat
+    messages, service messages, commands addressed to another bot
+    (/command@otherbot) and other update types are dropped before any
+    telegram objects are built.
+    """
+    if "callback_query" in data:
+        return True
+    message = data.get("message") or data.get("edited_message")
+    if not message:
+        return False
+    text = message.get("text")
+    if not text or text[0] != "/":
+        return False
+    command, _, addressee = text.split(maxsplit=1)[0][1:].lower().partition("@")
+    if addressee and bot_username and addressee != bot_username.lower():
+        return False
+    return command in commands
@@ -0,0 +1,34 @@
+"""Creates or upgrades the bot's database.
+
+    python -m utils.init_db [--config config.json] [--status]
+
+Safe to run against a live database: applied migrations are skipped and
+missing indexes are built without blocking writes on Postgres.
+"""
+import argparse
+import logging
+
+from utils.db import create_db_engine, init_db, load_config
+from utils.migrations import MIGRATIONS, applied_versions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config.json", help="database configuration file")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_db_engine(config=load_config(args.config))
+    if args.status:
+        done = applied_versions(engine)
+        for migration in MIGRATIONS:
+            print(f"{migration.version:4d} {'applied' if migration.version in done else 'pending':8s} {migration.name}")
+        return
+
+    applied = init_db(engine)
+    print(f"Applied {len(applied)} migration(s); the database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+from collections import Counter, namedtuple
+
+# A player to place; `courts` are the courts (events) they signed up for, empty meaning any
+MatchPlayer = namedtuple("MatchPlayer", "id skill position courts")
+Court = namedtuple("Court", "id capacity")
+
+# Cost weights: skill point difference between the two teams of a court,
+# uneven split of a position between them, and a player away from the courts they chose
+BALANCE_WEIGHT = 1.0
+POSITION_WEIGHT = 5.0
+PREFERENCE_WEIGHT = 20.0
+
+
+class MatchResult:
+    """Teams per court plus the players that did not fit."""
+
+    def __init__(self, teams, waitlist, cost):
+        self.teams = teams  # {court_id: (team_a_ids, team_b_ids)}
+        self.waitlist = waitlist
+        self.cost = cost
+
+    def __repr__(self):
+        return f"<MatchResult(courts={len(self.teams)}, waitlist={len(self.waitlist)}, cost={self.cost:.1f})>"
+
+
+class _State:
+    """Team assignment with running per-team skill sums and position counts."""
+
+    def __init__(self, players, courts, weights):
+        self.players = players
+        self.courts = courts
+        self.balance_weight, self.position_weight, self.preference_weight = weights
+        self.team_of = {}
+        self.sums = [0.0] * (2 * len(courts))
+        self.positions = [Counter() for _ in range(2 * len(courts))]
+
+    def place(self, index, team):
+        player = self.players[index]
+        self.team_of[index] = team
+        self.sums[team] += player.skill
+        if player.position:
+            self.positions[team][player.position] += 1
+
+    def remove(self, index):
+        player = self.players[index]
+        team = self.team_of.pop(index)
+        self.sums[team] -= player.skill
+        if player.position:
+            self.positions[team][player.position] -= 1
+        return team
+
+    def preference_cost(self, index, team):
+        wanted = self.players[index].courts
+        if not wanted or self.courts[team // 2].id in wanted:
+            return 0.0
+        return self.preference_weight
+
+    def court_cost(self, court):
+        a, b = 2 * court, 2 * court + 1
+        cost = self.balance_weight * abs(self.sums[a] - self.sums[b])
+        pos_a, pos_b = self.positions[a], self.positions[b]
+        for position in pos_a.keys() | pos_b.keys():
+            cost += self.position_weight * max(0, abs(pos_a[position] - pos_b[position]) - 1)
+        return cost
+
+    def total_cost(self):
+        cost = sum(self.court_cost(court) for court in range(len(self.courts)))
+        return cost + sum(self.preference_cost(index, team) for index, team in self.team_of.items())
+
+
+def _assign_courts(players, courts):
+    """Seats players in sign-up order, preferring their chosen courts and the emptiest one."""
+    court_index = {court.id: number for number, court in enumerate(courts)}
+    members = [[] for _ in courts]
+    waitlist = []
+    for index, player in enumerate(players):
+        open_courts = [number for number, court in enumerate(courts) if len(members[number]) < court.capacity]
+        preferred = [court_index[c] for c in player.courts if c in court_index and court_index[c] in open_courts]
+        candidates = preferred or open_courts
+        if not candidates:
+            waitlist.append(index)
+            continue
+        best = min(candidates, key=lambda number: len(members[number]) / courts[number].capacity)
+        members[best].append(index)
+    return members, waitlist
+
+
+def _split_teams(state, members):
+    """Snake-drafts each court's players into two teams by descending skill."""
+    for court, indices in enumerate(members):
+        ordered = sorted(indices, key=lambda index: state.players[index].skill, reverse=True)
+        for rank, index in enumerate(ordered):
+            side = 0 if rank % 4 in (0, 3) else 1
+            state.place(index, 2 * court + side)
+
+
+def _try_swap(state, first, second):
+    """Swaps two players between teams if that strictly lowers the cost; returns whether it did."""
+    team_a, team_b = state.team_of[first], state.team_of[second]
+    if team_a == team_b:
+        return False
+    courts = {team_a // 2, team_b // 2}
+    before = sum(state.court_cost(court) for court in courts)
+    before += state.preference_cost(first, team_a) + state.preference_cost(second, team_b)
+
+    state.remove(first)
+    state.remove(second)
+    state.place(first, team_b)
+    state.place(second, team_a)
+
+    after = sum(state.court_cost(court) for court in courts)
+    after += state.preference_cost(first, team_b) + state.preference_cost(second, team_a)
+    if after < before:
+        return True
+    state.remove(first)
+    state.remove(second)
+    state.place(first, team_a)
+    state.place(second, team_b)
+    return False
+
+
+def _members(state):
+    teams = [[] for _ in state.sums]
+    for index, team in state.team_of.items():
+        teams[team].append(index)
+    return teams
+
+
+def _fix_preferences(state):
+    """Tries to move players seated away from their chosen courts into one of them."""
+    court_index = {court.id: number for number, court in enumerate(state.courts)}
+    improved = False
+    teams = _members(state)
+    for index in list(state.team_of):
+        if not state.preference_cost(index, state.team_of[index]):
+            continue
+        for court_id in state.players[index].courts:
+            court = court_index.get(court_id)
+            if court is None:
+                continue
+            for other in teams[2 * court] + teams[2 * court + 1]:
+                if _try_swap(state, index, other):
+                    improved = True
+                    teams = _members(state)
+                    break
+            if not state.preference_cost(index, state.team_of[index]):
+                break
+    return improved
+
+
+def _balance_courts(state):
+    """Swaps players between the two teams of each court while that lowers the court's cost."""
+    improved = False
+    teams = _members(state)
+    for court in range(len(state.courts)):
+        side_a, side_b = teams[2 * court], teams[2 * court + 1]
+        for i in range(len(side_a)):
+            for j in range(len(side_b)):
+                if _try_swap(state, side_a[i], side_b[j]):
+                    side_a[i], side_b[j] = side_b[j], side_a[i]
+                    improved = True
+    return improved
+
+
+def solve(players, courts, max_passes=20, weights=None):
+    """Distributes players over courts and splits each court into two balanced teams.
+
+    `players` should be in sign-up order: when there are more players than
+    seats, the latest sign-ups go to the waitlist. Local search runs until a
+    pass finds no improving swap, so the result is deterministic.
+    """
+    players = list(players)
+    courts = list(courts)
+    state = _State(players, courts, weights or (BALANCE_WEIGHT, POSITION_WEIGHT, PREFERENCE_WEIGHT))
+
+    members, waitlist = _assign_courts(players, courts)
+    _split_teams(state, members)
+    for _ in range(max_passes):
+        improved = _fix_preferences(state)
+        if not _balance_courts(state) and not improved:
+            break
+
+    teams = {court.id: ([], []) for court in courts}
+    for index in sorted(state.team_of):
+        team = state.team_of[index]
+        teams[courts[team // 2].id][team % 2].append(players[index].id)
+    return MatchResult(teams, [players[index].id for index in waitlist], state.total_cost())
@@ -0,0 +1,143 @@
+"""Message catalogs: the bot's user-facing texts, one JSON file per language.
+
+Each file in data/messages/ maps a message key to a str.format template,
+or, for texts that mention a count, to its plural forms ({"one": ...,
+"other": ...} in English, {"one", "few", "many"} in Russian). Templates
+are compiled once when the catalog loads: texts without placeholders are
+rendered up front and returned as-is, the rest keep a bound str.format_map.
+"""
+import functools
+import json
+import logging
+import os
+import string
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_DIR = "data/messages"
+DEFAULT_LANGUAGE = "en"
+
+_FORMATTER = string.Formatter()
+
+
+def _plural_en(n):
+    return "one" if n == 1 else "other"
+
+
+def _plural_ru(n):
+    if n % 10 == 1 and n % 100 != 11:
+        return "one"
+    if 2 <= n % 10 <= 4 and not 12 <= n % 100 <= 14:
+        return "few"
+    return "many"
+
+
+# Language -> (plural forms its catalog provides, rule picking one for a count)
+PLURAL_RULES = {
+    "en": (("one", "other"), _plural_en),
+    "ru": (("one", "few", "many"), _plural_ru),
+}
+
+
+def _fields(template):
+    """Root names of the template's placeholders, e.g. {"date"} for "{date:%H:%M}"."""
+    names = set()
+    for _, field, _, _ in _FORMATTER.parse(template):
+        if field is not None:
+            if not field or field.isdigit():
+                raise ValueError(f"Positional placeholder in {template!r}")
+            names.add(field.split(".")[0].split("[")[0])
+    return names
+
+
+def _compile(template):
+    fields = _fields(template)
+    # "{{" in a static text still needs unescaping, so it goes through format once
+    return (template.format() if not fields else template.format_map), fields
+
+
+class _Plural:
+    """A message with one template per plural form, picked by its `count` value."""
+
+    __slots__ = ("rule", "forms")
+
+    def __init__(self, rule, forms):
+        self.rule = rule
+        self.forms = forms
+
+    def __call__(self, values):
+        form = self.forms[self.rule(values["count"])]
+        return form if form.__class__ is str else form(values)
+
+
+class Catalog:
+    """Compiled message templates of every language, with missing keys filled from the default."""
+
+    def __init__(self, languages, default=DEFAULT_LANGUAGE):
+        if default not in languages:
+            raise ValueError(f"No messages for the default language {default!r}")
+        self.default = default
+        self.messages = {}
+        fields = {}
+        self.messages[default] = self._compile_language(default, languages[default], fields)
+        for lang, templates in languages.items():
+            if lang == default:
+                continue
+            unknown = set(templates) - set(fields)
+            if unknown:
+                raise ValueError(f"{lang}: keys missing from {default}: {', '.join(sorted(unknown))}")
+            compiled = self._compile_language(lang, templates, fields)
+            missing = set(fields) - set(compiled)
+            if missing:
+                logger.warning(f"{lang}: {len(missing)} message(s) fall back to {default}: {', '.join(sorted(missing))}")
+            self.messages[lang] = {**self.messages[default], **compiled}
+
+    def _compile_language(self, lang, templates, fields):
+        """Compiles one language; the default fills `fields`, the others are checked against it."""
+        forms, rule = PLURAL_RULES.get(lang, PLURAL_RULES[DEFAULT_LANGUAGE])
+        compiled = {}
+        for key, template in templates.items():
+            if isinstance(template, dict):
+                if set(template) != set(forms):
+                    raise ValueError(f"{lang}: {key} needs the plural forms {', '.join(forms)}")
+                variants = {form: _compile(text) for form, text in template.items()}
+                names = set().union(*(names for _, names in variants.values())) | {"count"}
+                entry = _Plural(rule, {form: render for form, (render, _) in variants.items()})
+            else:
+                entry, names = _compile(template)
+            if lang == self.default:
+                fields[key] = names
+            elif not names <= fields[key]:
+                extra = ", ".join(sorted(names - fields[key]))
+                raise ValueError(f"{lang}: {key} uses placeholders the {self.default} text does not: {extra}")
+            compiled[key] = entry
+        return compiled
+
+    def language(self, language_code):
+        """The catalog language for a Telegram language_code such as "ru" or "en-US"."""
+        if language_code:
+            lang = language_code.split("-")[0].lower()
+            if lang in self.messages:
+                return lang
+        return self.default
+
+    def render(self, lang, key, **values):
+        """The message text; plural messages pick their form from the `count` value."""
+        entry = self.messages[lang][key]
+        return entry if entry.__class__ is str else entry(values)
+
+
+def load_catalog(directory=MESSAGES_DIR, default=DEFAULT_LANGUAGE):
+    """Reads and compiles every <language>.json in the directory."""
+    languages = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                languages[name[: -len(".json")]] = json.load(f)
+    return Catalog(languages, default=default)
+
+
+@functools.lru_cache(maxsize=None)
+def default_catalog():
+    """The bot's catalog, compiled on first use; DEFAULT_LANGUAGE picks the fallback language."""
+    return load_catalog(default=os.environ.get("DEFAULT_LANGUAGE", DEFAULT_LANGUAGE))
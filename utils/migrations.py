@@ -0,0 +1,197 @@
+import logging
+import os
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import inspect, insert, select, text
+from sqlalchemy.orm import Session
+
+from models import Base, Question, SchemaMigration
+from utils import stats
+from utils.db import load_questions
+from utils.schema_history import V1, V5
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple("Migration", "version name apply")
+
+# Indexes that were declared in earlier versions of models.py and are now redundant
+DROPPED_INDEXES = (
+    "player_telegram_id_idx",  # players.telegram_id is unique
+    "event_participant_event_id_idx",  # prefix of event_participant_event_player_idx
+)
+
+
+def _create_tables(conn):
+    # Creates missing tables only; existing ones are changed by the steps below
+    V1.create_all(conn, checkfirst=True)
+
+
+def _add_missing_columns(conn, table, names):
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for name in names:
+        if name in existing:
+            continue
+        column = table.c[name]
+        # Added as nullable: rows written before the column existed have no value
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(conn.dialect)}"))
+
+
+def _event_columns(conn):
+    _add_missing_columns(conn, V1.tables["events"], ("chat_id", "roster_message_id", "series_id"))
+
+
+def _dedupe_participants(conn):
+    # Racing joins could add a player twice before event_participant_event_player_idx existed
+    conn.execute(text(
+        "DELETE FROM event_participants WHERE id NOT IN "
+        "(SELECT MIN(id) FROM event_participants GROUP BY event_id, player_id)"
+    ))
+
+
+def _load_questions(conn):
+    if conn.execute(select(Question.id).limit(1)).first():
+        return
+    # The session joins the migration's transaction; its commit does not end it
+    load_questions(Session(bind=conn))
+
+
+def _player_stats(conn):
+    V5.tables["player_stats"].create(conn, checkfirst=True)
+    _add_missing_columns(conn, V5.tables["event_participants"], ("outcome",))
+    # Totals of games joined before the table existed
+    stats.rebuild(conn)
+
+
+def _bigint_telegram_ids(conn):
+    # SQLite integers are already 64-bit
+    if conn.dialect.name != "postgresql":
+        return
+    for table in ("players", "group_admins"):
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN telegram_id TYPE BIGINT"))
+
+
+def _legacy_group(conn):
+    # Events and players from before group chats belong to the one group the bot served then
+    orphan_events = conn.execute(text("SELECT COUNT(*) FROM events WHERE chat_id IS NULL")).scalar()
+    orphan_players = conn.execute(text(
+        "SELECT COUNT(*) FROM players WHERE id NOT IN (SELECT player_id FROM group_members)"
+    )).scalar()
+    if not orphan_events and not orphan_players:
+        return
+    chat_id = os.environ.get("LEGACY_CHAT_ID")
+    if not chat_id:
+        raise RuntimeError(
+            f"{orphan_events} event(s) and {orphan_players} player(s) predate group chats; "
+            "set LEGACY_CHAT_ID to the chat they belong to and run the migration again"
+        )
+    chat_id = int(chat_id)
+    conn.execute(text("UPDATE events SET chat_id = :chat_id WHERE chat_id IS NULL"), {"chat_id": chat_id})
+    conn.execute(
+        text(
+            "INSERT INTO group_members (chat_id, player_id, joined_at) "
+            "SELECT :chat_id, id, :now FROM players WHERE id NOT IN (SELECT player_id FROM group_members)"
+        ),
+        {"chat_id": chat_id, "now": datetime.utcnow()},
+    )
+    logger.info(f"Assigned {orphan_events} event(s) and {orphan_players} player(s) to chat {chat_id}")
+
+
+MIGRATIONS = (
+    Migration(1, "create tables", _create_tables),
+    Migration(2, "event chat, roster message and series columns", _event_columns),
+    Migration(3, "remove duplicate event participants", _dedupe_participants),
+    Migration(4, "load survey questions", _load_questions),
+    Migration(5, "player stats", _player_stats),
+    Migration(6, "64-bit Telegram user IDs", _bigint_telegram_ids),
+    Migration(7, "assign pre-group events and players to LEGACY_CHAT_ID", _legacy_group),
+)
+
+
+def _index_statement(index, online):
+    columns = ", ".join(column.name for column in index.columns)
+    unique = "UNIQUE " if index.unique else ""
+    concurrently = "CONCURRENTLY " if online else ""
+    return f"CREATE {unique}INDEX {concurrently}IF NOT EXISTS {index.name} ON {index.table.name} ({columns})"
+
+
+def _invalid_indexes(conn):
+    """Names of indexes left INVALID by a failed or interrupted CREATE INDEX CONCURRENTLY."""
+    if conn.dialect.name != "postgresql":
+        return set()
+    return set(conn.execute(text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid"
+    )).scalars())
+
+
+def sync_indexes(engine):
+    """Creates the indexes declared in models.py that are missing and drops retired ones.
+
+    Runs outside a transaction, one statement at a time. On Postgres indexes
+    are built with CONCURRENTLY, so tables stay writable while they build;
+    one left invalid by an earlier failed build is dropped and built again.
+    Returns the names of the indexes created and dropped.
+    """
+    online = engine.dialect.name == "postgresql"
+    created, dropped = [], []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        existing = {
+            index["name"]
+            for table in tables
+            for index in inspector.get_indexes(table)
+        }
+        declared = {index.name for table in Base.metadata.sorted_tables for index in table.indexes}
+        for name in sorted(_invalid_indexes(conn) & declared):
+            # IF NOT EXISTS would keep the broken index, which the planner never uses
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            existing.discard(name)
+            logger.warning(f"Dropped invalid index {name}; rebuilding it")
+        for name in DROPPED_INDEXES:
+            if name in existing:
+                conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if online else ''}IF EXISTS {name}"))
+                dropped.append(name)
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    conn.execute(text(_index_statement(index, online)))
+                    created.append(index.name)
+    return created, dropped
+
+
+def applied_versions(engine):
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(SchemaMigration.__tablename__):
+            return set()
+        return set(conn.execute(select(SchemaMigration.version)).scalars())
+
+
+def migrate(engine):
+    """Applies pending migrations in order, each in its own transaction, then syncs indexes.
+
+    Returns the versions applied.
+    """
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    done = applied_versions(engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.name}")
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(insert(SchemaMigration).values(
+                version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.version)
+
+    created, dropped = sync_indexes(engine)
+    for name in created:
+        logger.info(f"Created index {name}")
+    for name in dropped:
+        logger.info(f"Dropped index {name}")
+    return applied
@@ -0,0 +1,153 @@
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# SQL statements of the update being handled, or None when nothing is recording
+_statements = contextvars.ContextVar("profiling_statements", default=None)
+
+_SAFE_NAME = re.compile(r"^[\w.-]+\.json$")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _statements.get() is not None:
+        conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is None:
+        return
+    started = conn.info.get("profiling_started")
+    elapsed = time.perf_counter() - started.pop() if started else 0.0
+    statements.append({"sql": statement, "ms": round(elapsed * 1000, 3)})
+
+
+class UpdateProfiler:
+    """Samples updates with cProfile and keeps a record of slow ones.
+
+    While enabled, every update records its SQL statements and a
+    `sample_rate` fraction also runs under cProfile. Updates slower than
+    `threshold` seconds are written as JSON files to `directory`, which
+    keeps only the newest `keep` captures.
+
+    After share(), settings changed in one worker apply to every worker;
+    captures are still written by the worker that handled the update.
+    """
+
+    def __init__(self, engine, directory="profiles", sample_rate=0.0, threshold=1.0, keep=50):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.keep = keep
+        self.enabled = False
+        self.coordinator = None
+        self._profiling = False
+        # Without a database there are no statements to record, only timings
+        if engine is not None:
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def share(self, coordinator):
+        """Keeps the settings in the coordinator's shared state and follows changes from other workers."""
+        self.coordinator = coordinator
+        coordinator.subscribe("profiling", self.reload)
+
+    def reload(self):
+        """Applies the shared settings, if any were stored."""
+        settings = self.coordinator.get_state("profiling") if self.coordinator else None
+        if settings:
+            self.enabled, self.sample_rate, self.threshold = settings["enabled"], settings["sample_rate"], settings["threshold"]
+
+    def configure(self, enabled=None, sample_rate=None, threshold=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, sample_rate))
+        if threshold is not None:
+            self.threshold = threshold
+        if self.coordinator:
+            self.coordinator.set_state("profiling", self.settings())
+            self.coordinator.invalidate("profiling")
+        return self.settings()
+
+    def settings(self):
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, "threshold": self.threshold}
+
+    async def run(self, coro, label):
+        """Awaits `coro`, profiling and capturing it according to the current settings."""
+        if not self.enabled:
+            return await coro
+
+        statements = []
+        token = _statements.set(statements)
+        # cProfile allows one active profiler per thread, so concurrent samples are skipped
+        profiler = None
+        if not self._profiling and random.random() < self.sample_rate:
+            self._profiling = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        began = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            elapsed = time.perf_counter() - began
+            if profiler:
+                profiler.disable()
+                self._profiling = False
+            _statements.reset(token)
+            if elapsed >= self.threshold:
+                self._capture(label, elapsed, statements, profiler)
+
+    def _capture(self, label, elapsed, statements, profiler):
+        record = {
+            "label": label,
+            "captured_at": datetime.utcnow().isoformat(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "sql_ms": round(sum(statement["ms"] for statement in statements), 3),
+            "statements": statements,
+            "profile": None,
+        }
+        if profiler:
+            # Other tasks running during awaits also show up in the profile
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(40)
+            record["profile"] = output.getvalue()
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            safe_label = re.sub(r"[^\w.-]", "_", label)
+            name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{safe_label}.json"
+            with open(os.path.join(self.directory, name), "w") as f:
+                json.dump(record, f, indent=1)
+            self._rotate()
+        except OSError as e:
+            logger.error(f"Could not write slow update capture: {e}")
+
+    def _rotate(self):
+        for name in self.list()[self.keep:]:
+            os.remove(os.path.join(self.directory, name))
+
+    def list(self):
+        """Capture file names, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name for name in os.listdir(self.directory) if _SAFE_NAME.match(name)), reverse=True)
+
+    def load(self, name):
+        """Reads one capture; returns None for unknown or unsafe names."""
+        if not _SAFE_NAME.match(name) or name not in self.list():
+            return None
+        with open(os.path.join(self.directory, name)) as f:
+            return json.load(f)
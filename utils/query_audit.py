@@ -0,0 +1,115 @@
+"""Checks the query plans of the bot's SQL for full table scans.
+
+    python -m utils.query_audit [--config config.json] [captures directory]
+
+Explains every distinct statement in the slow-update captures written by
+the update profiler (profiles/ by default) against the configured
+database and prints the ones that scan a whole table. The handler tests
+run the same check over every handler path with tests/test_query_plans.py.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+from collections import namedtuple
+
+from sqlalchemy import event, inspect
+
+from utils.db import create_db_engine, load_config
+
+Finding = namedtuple("Finding", "statement tables plan")
+
+# SQLite: "SCAN players" or "SCAN events USING INDEX ..."; Postgres: "Seq Scan on players"
+_SCAN = re.compile(r"^(?:SCAN|.*Seq Scan on) (\w+)")
+_AUDITED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def explain(conn, statement, parameters=()):
+    """Returns the lines of the statement's query plan."""
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters).all()]
+
+
+def full_scans(plan, tables):
+    """Tables the plan reads from start to end, including through a full index scan."""
+    scanned = []
+    for line in plan:
+        match = _SCAN.match(line.strip().lstrip("-> "))
+        if match and match.group(1) in tables and match.group(1) not in scanned:
+            scanned.append(match.group(1))
+    return scanned
+
+
+class StatementRecorder:
+    """Collects the distinct statements an engine runs, with the parameters of their first run."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = {}
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(_AUDITED) and statement not in self.statements:
+            self.statements[statement] = parameters[0] if executemany else parameters
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def audit(engine, statements):
+    """Explains each (statement, parameters) pair and returns a Finding for every full scan."""
+    findings = []
+    with engine.connect() as conn:
+        tables = set(inspect(conn).get_table_names())
+        for statement, parameters in statements:
+            plan = explain(conn, statement, parameters)
+            scanned = full_scans(plan, tables)
+            if scanned:
+                findings.append(Finding(statement, scanned, plan))
+    return findings
+
+
+def _null_parameters(statement, dialect):
+    # Captures keep the SQL without its values; plans rarely depend on them
+    if dialect.paramstyle == "qmark":
+        return (None,) * statement.count("?")
+    return {name: None for name in re.findall(r"%\((\w+)\)s", statement)}
+
+
+def captured_statements(directory):
+    """Distinct audited statements from the profiler's capture files."""
+    statements = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path) as f:
+            for item in json.load(f).get("statements", []):
+                sql = item["sql"]
+                if sql.lstrip().upper().startswith(_AUDITED) and sql not in statements:
+                    statements.append(sql)
+    return statements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("captures", nargs="?", default="profiles", help="directory of slow-update captures")
+    parser.add_argument("--config", default="config.json", help="database configuration file")
+    args = parser.parse_args(argv)
+
+    engine = create_db_engine(config=load_config(args.config))
+    statements = captured_statements(args.captures)
+    findings = audit(engine, [(sql, _null_parameters(sql, engine.dialect)) for sql in statements])
+    for finding in findings:
+        print(f"Full scan of {', '.join(finding.tables)}:\n  {' '.join(finding.statement.split())}")
+        for line in finding.plan:
+            print(f"    {line}")
+    print(f"{len(statements)} statement(s) checked, {len(findings)} with full scans.")
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+
+from telegram.error import BadRequest, TelegramError
+
+from models import Event, EventParticipant, Player
+from utils.coordination import LocalCoordinator
+from utils.messages import default_catalog
+
+logger = logging.getLogger(__name__)
+
+
+def render_roster(event, players):
+    """Builds the roster message text for an event and its (name, handle) rows.
+
+    The roster is shared by the whole group, so it uses the catalog's default language.
+    """
+    catalog = default_catalog()
+    lang = catalog.default
+    lines = [
+        catalog.render(lang, "roster.header_dated" if event.date else "roster.header", name=event.name, date=event.date),
+        catalog.render(lang, "roster.count", count=len(players), limit=event.max_participants),
+    ]
+    unknown = catalog.render(lang, "roster.unknown")
+    for number, (name, handle) in enumerate(players, start=1):
+        label = name or (f"@{handle}" if handle else unknown)
+        lines.append(catalog.render(lang, "roster.line", number=number, label=label))
+    return "\n".join(lines)
+
+
+def load_roster_text(session, event_id):
+    """Reads the event and its participants and renders the roster text."""
+    event = session.get(Event, event_id)
+    if not event:
+        return None, None
+    players = (
+        session.query(Player.name, Player.telegram_handle)
+        .join(EventParticipant, EventParticipant.player_id == Player.id)
+        .filter(EventParticipant.event_id == event_id)
+        .order_by(EventParticipant.joined_at, EventParticipant.id)
+        .all()
+    )
+    return event, render_roster(event, players)
+
+
+class RosterUpdater:
+    """Keeps one pinned roster message per event, editing it in place.
+
+    Changes are debounced: the first change to an event schedules an edit
+    `delay` seconds later and every change before then is folded into it.
+    Edits of the same event are also spaced at least `min_interval` seconds
+    apart to stay under Telegram's per-chat edit limits.
+
+    The pending edit and the time of the last one are kept in the
+    coordinator, so with several workers a change is folded into an edit
+    another worker has scheduled. That worker marks the edit as started
+    before it reads the roster, so changes committed until then are shown.
+    """
+
+    def __init__(self, bot, Session, coordinator=None, delay=2.0, min_interval=3.0):
+        self.bot = bot
+        self.Session = Session
+        self.coordinator = coordinator or LocalCoordinator()
+        self.delay = delay
+        self.min_interval = min_interval
+        self.edits = 0
+        self._pending = {}
+
+    async def post(self, event_id):
+        """Sends and pins the roster message of a new event."""
+        session = self.Session()
+        try:
+            event, text = load_roster_text(session, event_id)
+            if not event:
+                return None
+            message = await self.bot.send_message(chat_id=event.chat_id, text=text)
+            event.roster_message_id = message.message_id
+            session.commit()
+            chat_id = event.chat_id
+        finally:
+            session.close()
+
+        try:
+            await self.bot.pin_chat_message(
+                chat_id=chat_id, message_id=message.message_id, disable_notification=True
+            )
+        except TelegramError as e:
+            # The bot needs the "pin messages" right; the roster still works unpinned
+            logger.warning(f"Could not pin roster for event {event_id}: {e}")
+        return message.message_id
+
+    def schedule(self, event_id):
+        """Marks an event's roster as changed; the edit happens after the debounce delay."""
+        if event_id in self._pending:
+            return
+        now = time.time()
+        shared = self.coordinator.get_state(f"roster:{event_id}") or {}
+        # Another worker's edit is still to come; one left behind by a crashed worker is retaken
+        if shared.get("due") is not None and shared["due"] > now - self.delay:
+            return
+        last_edit = shared.get("last_edit")
+        wait = max(self.delay, self.min_interval - (now - last_edit)) if last_edit else self.delay
+        self.coordinator.set_state(f"roster:{event_id}", {"due": now + wait, "last_edit": last_edit})
+        self._pending[event_id] = asyncio.get_running_loop().call_later(
+            wait, lambda: asyncio.ensure_future(self._run(event_id))
+        )
+
+    @property
+    def pending(self):
+        """Event IDs with an edit that has not been sent yet."""
+        return set(self._pending)
+
+    async def flush(self):
+        """Sends every pending edit immediately."""
+        for event_id in list(self._pending):
+            await self._run(event_id)
+
+    async def _run(self, event_id):
+        handle = self._pending.pop(event_id, None)
+        if handle is None:
+            return
+        handle.cancel()
+        try:
+            # Started before the roster is read: later changes schedule a new edit
+            self.coordinator.set_state(f"roster:{event_id}", {"due": None, "last_edit": time.time()})
+            await self._edit(event_id)
+        except Exception as e:
+            logger.error(f"Roster update for event {event_id} failed: {e}")
+
+    async def _edit(self, event_id):
+        session = self.Session()
+        try:
+            event, text = load_roster_text(session, event_id)
+            chat_id = event.chat_id if event else None
+            message_id = event.roster_message_id if event else None
+        finally:
+            session.close()
+        if not message_id:
+            return
+
+        try:
+            await self.bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
+            self.edits += 1
+        except BadRequest as e:
+            # Joins and leaves inside one window can cancel out
+            if "not modified" not in str(e).lower():
+                raise
@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, update
+
+from models import Event, EventParticipant, Player, ScheduledJob
+from utils import series
+from utils.messages import default_catalog
+
+logger = logging.getLogger(__name__)
+
+# Reminders go out this long before an event; the event is closed CLOSE_AFTER its start
+REMINDER_OFFSETS = (timedelta(hours=24), timedelta(hours=2))
+CLOSE_AFTER = timedelta(hours=3)
+# Upper bound on a single sleep, so a changed system clock is noticed eventually
+MAX_SLEEP_SECONDS = 3600
+# First delay before retrying a failed run; doubles on each further failure
+RETRY_SECONDS = 5
+
+
+def event_job_rows(event_id, date, now):
+    """Reminder and auto-close job rows for an event; reminders already past are left out."""
+    rows = [
+        {"event_id": event_id, "kind": "reminder", "due_at": date - offset}
+        for offset in REMINDER_OFFSETS
+        if date - offset > now
+    ]
+    rows.append({"event_id": event_id, "kind": "close", "due_at": date + CLOSE_AFTER})
+    return rows
+
+
+def _insert_jobs(session, rows):
+    if not rows:
+        return []
+    return [tuple(row) for row in session.execute(insert(ScheduledJob).returning(ScheduledJob.due_at, ScheduledJob.id), rows)]
+
+
+def schedule_event_jobs(session, event, now=None):
+    """Adds the reminder and auto-close jobs for a dated event; returns their (due_at, id) pairs."""
+    if not event.date:
+        return []
+    return _insert_jobs(session, event_job_rows(event.id, event.date, now or datetime.utcnow()))
+
+
+def materialize_series(session, series_ids, now=None):
+    """Creates the next window of events for the given series and schedules their jobs.
+
+    Returns the (due_at, id) pairs of the new jobs and the IDs of the events created.
+    """
+    now = now or datetime.utcnow()
+    created, refills = series.materialize(session, series_ids, now)
+    rows = [row for event_id, date in created for row in event_job_rows(event_id, date, now)]
+    rows += [{"series_id": series_id, "kind": "series", "due_at": due_at} for series_id, due_at in refills]
+    return _insert_jobs(session, rows), [event_id for event_id, _ in created]
+
+
+def _format_hours(catalog, lang, delta):
+    return catalog.render(lang, "reminder.hours", count=round(delta.total_seconds() / 3600))
+
+
+class JobScheduler:
+    """Runs due jobs from the scheduled_jobs table.
+
+    The table is the source of truth: every run claims due rows by deleting
+    them, so a job runs once even when a cron tick and the in-process timer
+    race. The in-process timer keeps a min-heap of due times and sleeps until
+    the earliest one, so it only wakes up when there is work to do.
+
+    Events created for a series get their roster message from `roster`,
+    the RosterUpdater, when one is given.
+    """
+
+    def __init__(self, bot, Session, clock=datetime.utcnow, roster=None):
+        self.bot = bot
+        self.Session = Session
+        self.clock = clock
+        self.roster = roster
+        self._heap = []
+        # Created in start(): on Python 3.9 an Event binds to the loop current at creation
+        self._wake = None
+        self._task = None
+        self._stopping = False
+        # Reminders claimed by runs in progress and not sent yet
+        self._unsent = 0
+
+    def push(self, jobs):
+        """Adds (due_at, job_id) pairs of newly scheduled jobs to the in-process timer."""
+        for job in jobs:
+            heapq.heappush(self._heap, tuple(job))
+        if self._wake:
+            self._wake.set()
+
+    def load(self):
+        """Fills the heap from pending jobs; completed jobs are deleted, so this stays small."""
+        session = self.Session()
+        try:
+            rows = session.query(ScheduledJob.due_at, ScheduledJob.id).all()
+        finally:
+            session.close()
+        self._heap = [tuple(row) for row in rows]
+        heapq.heapify(self._heap)
+        return len(self._heap)
+
+    def start(self):
+        self.load()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self, timeout=10.0):
+        """Stops the timer, letting a run in progress finish for up to `timeout` seconds.
+
+        Returns the number of claimed reminders that were still unsent when the
+        run had to be cancelled; their jobs are already deleted, so they are lost.
+        """
+        if not self._task:
+            return 0
+        self._stopping = True
+        self._wake.set()
+        unsent = 0
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            unsent = self._unsent
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        return unsent
+
+    async def _loop(self):
+        failures = 0
+        while not self._stopping:
+            now = self.clock()
+            timeout = MAX_SLEEP_SECONDS
+            if self._heap and self._heap[0][0] <= now:
+                try:
+                    await self.run_due(now)
+                except Exception as e:
+                    # The jobs are still in the table and the heap: retry with a growing delay
+                    failures += 1
+                    timeout = min(RETRY_SECONDS * 2 ** (failures - 1), MAX_SLEEP_SECONDS)
+                    logger.error(f"Scheduled jobs failed, retrying in {timeout}s: {e}")
+                else:
+                    failures = 0
+                    while self._heap and self._heap[0][0] <= now:
+                        heapq.heappop(self._heap)
+                    continue
+            elif self._heap:
+                timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+            self._wake.clear()
+            if self._stopping:
+                break
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_due(self, now=None):
+        """Claims and runs every job due by `now`; returns counts of what was done."""
+        now = now or self.clock()
+        session = self.Session()
+        try:
+            due = (
+                session.query(ScheduledJob.id)
+                .filter(ScheduledJob.due_at <= now)
+                .order_by(ScheduledJob.due_at)
+                .all()
+            )
+            if not due:
+                return {"reminders": 0, "closed": 0, "occurrences": 0}
+            claimed = session.execute(
+                delete(ScheduledJob)
+                .where(ScheduledJob.id.in_([row.id for row in due]))
+                .returning(ScheduledJob.event_id, ScheduledJob.series_id, ScheduledJob.kind)
+            ).all()
+            reminder_events = {row.event_id for row in claimed if row.kind == "reminder"}
+            close_events = {row.event_id for row in claimed if row.kind == "close"}
+            series_ids = {row.series_id for row in claimed if row.kind == "series"}
+
+            new_jobs, occurrences = [], []
+            if series_ids:
+                new_jobs, occurrences = materialize_series(session, series_ids, now)
+
+            if close_events:
+                session.execute(
+                    update(Event).where(Event.id.in_(close_events)).values(is_active=False)
+                )
+            messages = self._reminder_messages(session, reminder_events - close_events, now)
+            session.commit()
+        finally:
+            session.close()
+        self.push(new_jobs)
+
+        self._unsent += len(messages)
+        results = await asyncio.gather(
+            *(self._send(chat_id, text) for chat_id, text in messages), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Reminder could not be sent: {result}")
+        if self.roster:
+            for event_id in occurrences:
+                try:
+                    await self.roster.post(event_id)
+                except Exception as e:
+                    logger.error(f"Roster for event {event_id} could not be posted: {e}")
+        return {"reminders": len(messages), "closed": len(close_events), "occurrences": len(occurrences)}
+
+    async def _send(self, chat_id, text):
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text)
+        finally:
+            self._unsent -= 1
+
+    def _reminder_messages(self, session, event_ids, now):
+        """Builds one reminder per event, reading all events and participants in two queries."""
+        if not event_ids:
+            return []
+        events = (
+            session.query(Event)
+            .filter(Event.id.in_(event_ids), Event.is_active == True)  # noqa: E712
+            .all()
+        )
+        players = {}
+        rows = (
+            session.query(EventParticipant.event_id, Player.name, Player.telegram_handle)
+            .join(Player, EventParticipant.player_id == Player.id)
+            .filter(EventParticipant.event_id.in_(event_ids))
+            .order_by(EventParticipant.joined_at, EventParticipant.id)
+            .all()
+        )
+        # Reminders go to the whole group, in the catalog's default language
+        catalog = default_catalog()
+        lang = catalog.default
+        unnamed = catalog.render(lang, "common.player")
+        for row in rows:
+            players.setdefault(row.event_id, []).append(
+                f"@{row.telegram_handle}" if row.telegram_handle else (row.name or unnamed)
+            )
+
+        messages = []
+        for event in events:
+            # A reminder delivered after the game started would only be noise
+            if not event.date or event.date <= now:
+                continue
+            text = catalog.render(
+                lang, "reminder.text", name=event.name, hours=_format_hours(catalog, lang, event.date - now), date=event.date
+            )
+            if players.get(event.id):
+                text += "\n" + catalog.render(lang, "reminder.players", players=", ".join(players[event.id]))
+            messages.append((event.chat_id, text))
+        return messages
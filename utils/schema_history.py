@@ -0,0 +1,175 @@
+"""Frozen table definitions for the migrations in utils.migrations.
+
+A migration creates or alters tables from the snapshot taken when it was
+written, not from models.py, so later model changes cannot leak into it:
+an old database upgraded step by step ends up with the same schema as a
+new one. Never edit a snapshot once its migration has shipped; a schema
+change gets a new migration and, if it needs tables, a new snapshot.
+Indexes are not part of the snapshots; sync_indexes() builds them from
+models.py after the migrations ran.
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, Time
+
+# Migration 1: the tables as of the introduction of schema migrations
+V1 = MetaData()
+
+Table(
+    "players", V1,
+    Column("id", Integer, primary_key=True),
+    Column("telegram_id", Integer, unique=True, nullable=False),
+    Column("telegram_handle", String(100), unique=True, nullable=True),
+    Column("name", String(100), nullable=True),
+    Column("skill_level", Integer, default=0),
+    Column("preferred_position", String(50), nullable=True),
+    Column("is_active", Boolean, default=True),
+    Column("registered_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "questions", V1,
+    Column("id", Integer, primary_key=True),
+    Column("question_text", Text, nullable=False),
+    Column("question_weight", Integer, default=1),
+)
+
+Table(
+    "question_options", V1,
+    Column("id", Integer, primary_key=True),
+    Column("question_id", Integer, ForeignKey("questions.id"), nullable=False),
+    Column("option_text", String(200), nullable=False),
+    Column("response_points", Integer, nullable=False),
+)
+
+Table(
+    "responses", V1,
+    Column("id", Integer, primary_key=True),
+    Column("player_id", Integer, ForeignKey("players.id"), nullable=False),
+    Column("question_id", Integer, ForeignKey("questions.id"), nullable=False),
+    Column("option_id", Integer, ForeignKey("question_options.id"), nullable=False),
+    Column("response_time", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "events", V1,
+    Column("id", Integer, primary_key=True),
+    Column("chat_id", BigInteger, nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("description", Text, nullable=True),
+    Column("date", DateTime, nullable=True),
+    Column("location", String(255), nullable=True),
+    Column("max_participants", Integer, default=12),
+    Column("created_at", DateTime, default=datetime.utcnow),
+    Column("is_active", Boolean, default=True),
+    Column("roster_message_id", Integer, nullable=True),
+    Column("series_id", Integer, ForeignKey("event_series.id"), nullable=True),
+)
+
+Table(
+    "event_participants", V1,
+    Column("id", Integer, primary_key=True),
+    Column("event_id", Integer, ForeignKey("events.id"), nullable=False),
+    Column("player_id", Integer, ForeignKey("players.id"), nullable=False),
+    Column("joined_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "event_series", V1,
+    Column("id", Integer, primary_key=True),
+    Column("chat_id", BigInteger, nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("description", Text, nullable=True),
+    Column("weekday", Integer, nullable=False),
+    Column("start_time", Time, nullable=False),
+    Column("max_participants", Integer, default=12),
+    Column("until", DateTime, nullable=True),
+    Column("materialized_until", DateTime, nullable=True),
+    Column("is_active", Boolean, default=True),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "series_members", V1,
+    Column("id", Integer, primary_key=True),
+    Column("series_id", Integer, ForeignKey("event_series.id"), nullable=False),
+    Column("player_id", Integer, ForeignKey("players.id"), nullable=False),
+    Column("joined_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "scheduled_jobs", V1,
+    Column("id", Integer, primary_key=True),
+    Column("event_id", Integer, ForeignKey("events.id"), nullable=True),
+    Column("series_id", Integer, ForeignKey("event_series.id"), nullable=True),
+    Column("kind", String(20), nullable=False),
+    Column("due_at", DateTime, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "group_members", V1,
+    Column("id", Integer, primary_key=True),
+    Column("chat_id", BigInteger, nullable=False),
+    Column("player_id", Integer, ForeignKey("players.id"), nullable=False),
+    Column("joined_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "group_admins", V1,
+    Column("id", Integer, primary_key=True),
+    Column("chat_id", BigInteger, nullable=False),
+    Column("telegram_id", Integer, nullable=False),
+    Column("added_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "coordination_locks", V1,
+    Column("name", String(200), primary_key=True),
+    Column("owner", String(64), nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+)
+
+Table(
+    "coordination_counters", V1,
+    Column("name", String(200), primary_key=True),
+    Column("value", BigInteger, nullable=False, default=0),
+)
+
+Table(
+    "shared_state", V1,
+    Column("key", String(200), primary_key=True),
+    Column("value", Text, nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow),
+)
+
+Table(
+    "cache_invalidations", V1,
+    Column("id", Integer, primary_key=True),
+    Column("key", String(200), nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+# Migration 5: player stats and game outcomes
+V5 = MetaData()
+
+# Only the key player_stats refers to
+Table("players", V5, Column("id", Integer, primary_key=True))
+
+Table(
+    "event_participants", V5,
+    Column("id", Integer, primary_key=True),
+    Column("outcome", String(10), nullable=True),
+)
+
+Table(
+    "player_stats", V5,
+    Column("player_id", Integer, ForeignKey("players.id"), primary_key=True),
+    Column("events_joined", Integer, nullable=False, default=0),
+    Column("games_played", Integer, nullable=False, default=0),
+    Column("wins", Integer, nullable=False, default=0),
+    Column("losses", Integer, nullable=False, default=0),
+    Column("no_shows", Integer, nullable=False, default=0),
+    Column("form", String(10), nullable=False, default=""),
+    Column("updated_at", DateTime, default=datetime.utcnow),
+)
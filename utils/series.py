@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, insert
+
+from models import Event, EventParticipant, EventSeries, SeriesMember
+from utils import stats
+
+# Occurrences are created this far ahead, and the window is topped up every REFILL_EVERY
+WINDOW = timedelta(weeks=4)
+REFILL_EVERY = timedelta(weeks=1)
+
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+
+def parse_weekday(value):
+    """Accepts "tue", "Tuesday" or "1" (Monday is 0)."""
+    value = value.strip().lower()
+    if value.isdigit() and int(value) < 7:
+        return int(value)
+    return WEEKDAYS[value[:3]]
+
+
+def occurrences(series, start, end):
+    """Start times of a series after `start` and up to `end`, bounded by its `until`."""
+    if series.until:
+        end = min(end, series.until)
+    day = start.date() + timedelta(days=(series.weekday - start.weekday()) % 7)
+    moment = datetime.combine(day, series.start_time)
+    if moment <= start:
+        moment += timedelta(weeks=1)
+    while moment <= end:
+        yield moment
+        moment += timedelta(weeks=1)
+
+
+def materialize(session, series_ids, now=None):
+    """Creates the events of each series up to now + WINDOW.
+
+    All new events are written with one bulk insert, and the series' regular
+    players with a second one. Returns the new events as (event_id, date)
+    pairs and, for series with occurrences left, when to materialize next as
+    (series_id, due_at) pairs.
+    """
+    now = now or datetime.utcnow()
+    series_list = (
+        session.query(EventSeries)
+        .filter(EventSeries.id.in_(series_ids), EventSeries.is_active == True)  # noqa: E712
+        .all()
+    )
+    rows = []
+    refills = []
+    for series in series_list:
+        start = max(series.materialized_until or now, now)
+        end = now + WINDOW
+        for moment in occurrences(series, start, end):
+            rows.append({
+                "chat_id": series.chat_id,
+                "series_id": series.id,
+                "name": series.name,
+                "description": series.description,
+                "date": moment,
+                "max_participants": series.max_participants,
+                "is_active": True,
+            })
+        series.materialized_until = end
+        if not series.until or series.until > end:
+            refills.append((series.id, now + REFILL_EVERY))
+    if not rows:
+        return [], refills
+
+    created = session.execute(
+        insert(Event).returning(Event.id, Event.series_id, Event.date), rows
+    ).all()
+
+    capacity = {series.id: series.max_participants or 0 for series in series_list}
+    regulars = {}
+    for series_id, player_id in (
+        session.query(SeriesMember.series_id, SeriesMember.player_id)
+        .filter(SeriesMember.series_id.in_([series.id for series in series_list]))
+        .order_by(SeriesMember.id)
+    ):
+        regulars.setdefault(series_id, []).append(player_id)
+
+    participants = [
+        {"event_id": event.id, "player_id": player_id, "joined_at": now}
+        for event in created
+        for player_id in regulars.get(event.series_id, [])[:capacity[event.series_id]]
+    ]
+    if participants:
+        session.execute(insert(EventParticipant), participants)
+        joined = {}
+        for row in participants:
+            stats.add_deltas(joined, row["player_id"], {"events_joined": 1})
+        stats.record(session, joined)
+    return [(event.id, event.date) for event in created], refills
+
+
+def upcoming_events(session, series_id, now=None):
+    """IDs of the series' active events still to be played, in id order."""
+    now = now or datetime.utcnow()
+    return [
+        event_id for event_id, in session.query(Event.id).filter(
+            Event.series_id == series_id, Event.date > now, Event.is_active == True  # noqa: E712
+        ).order_by(Event.id)
+    ]
+
+
+def add_regular(session, series, player_id, event_ids, now=None):
+    """Makes a player a regular of a series and adds them to the given upcoming occurrences.
+
+    `event_ids` come from upcoming_events(); the caller holds their join
+    locks, so the capacity checks here do not race with /event_join.
+    Returns the IDs of the events the player was added to, or None when
+    they were already a regular.
+    """
+    now = now or datetime.utcnow()
+    if session.query(SeriesMember.id).filter_by(series_id=series.id, player_id=player_id).first():
+        return None
+    session.add(SeriesMember(series_id=series.id, player_id=player_id))
+    if not event_ids:
+        return []
+
+    upcoming = dict(
+        session.query(Event.id, Event.max_participants).filter(
+            Event.id.in_(event_ids), Event.date > now, Event.is_active == True  # noqa: E712
+        )
+    )
+    if not upcoming:
+        return []
+    # One row per event with its participant count and whether the player is among them
+    joined = set()
+    taken = {}
+    for event_id, count, is_member in (
+        session.query(
+            EventParticipant.event_id,
+            func.count(EventParticipant.id),
+            func.max(case((EventParticipant.player_id == player_id, 1), else_=0)),
+        )
+        .filter(EventParticipant.event_id.in_(list(upcoming)))
+        .group_by(EventParticipant.event_id)
+    ):
+        taken[event_id] = count
+        if is_member:
+            joined.add(event_id)
+    rows = [
+        {"event_id": event_id, "player_id": player_id, "joined_at": now}
+        for event_id, limit in upcoming.items()
+        if event_id not in joined and taken.get(event_id, 0) < (limit or 0)
+    ]
+    if rows:
+        session.execute(insert(EventParticipant), rows)
+        stats.record(session, {player_id: {"events_joined": len(rows)}})
+    return [row["event_id"] for row in rows]
@@ -0,0 +1,154 @@
+"""Per-player attendance and results, kept as running totals in player_stats.
+
+Joins, leaves and recorded results add deltas to a player's row, so /stats
+never aggregates event_participants. `rebuild` recomputes every row from
+history, for new databases and after manual data fixes:
+
+    python -m utils.stats rebuild [--config config.json] [--batch-size 1000]
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select, update
+
+from models import Event, EventParticipant, PlayerStats
+from utils.db import create_db_engine, load_config, upsert
+
+COUNTERS = ("events_joined", "games_played", "wins", "losses", "no_shows")
+# Counters a recorded outcome adds to
+OUTCOMES = {
+    "win": ("games_played", "wins"),
+    "loss": ("games_played", "losses"),
+    "noshow": ("no_shows",),
+}
+FORM_LETTERS = {"win": "W", "loss": "L"}
+FORM_LENGTH = 5
+
+
+def outcome_deltas(outcome, sign=1):
+    return {counter: sign for counter in OUTCOMES.get(outcome, ())}
+
+
+def add_deltas(deltas, player_id, changes):
+    """Adds `changes` ({counter: n}) to the pending deltas of a player."""
+    player = deltas.setdefault(player_id, {})
+    for counter, amount in changes.items():
+        player[counter] = player.get(counter, 0) + amount
+    return deltas
+
+
+def record(session, deltas):
+    """Applies {player_id: {counter: delta}} with one upsert for all players."""
+    rows = [
+        {"player_id": player_id, **{counter: changes.get(counter, 0) for counter in COUNTERS}}
+        for player_id, changes in deltas.items()
+        if any(changes.values())
+    ]
+    if not rows:
+        return
+    statement = upsert(session.get_bind().dialect, PlayerStats)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PlayerStats.player_id],
+        set_={
+            **{counter: getattr(PlayerStats, counter) + getattr(statement.excluded, counter) for counter in COUNTERS},
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    session.execute(statement, [{**row, "form": "", "updated_at": datetime.utcnow()} for row in rows])
+
+
+def _played_on():
+    return func.coalesce(Event.date, Event.created_at)
+
+
+def refresh_form(session, player_ids):
+    """Recomputes the recent form of the given players from their latest results, in one query."""
+    if not player_ids:
+        return
+    ranked = (
+        select(
+            EventParticipant.player_id,
+            EventParticipant.outcome,
+            func.row_number().over(
+                partition_by=EventParticipant.player_id,
+                order_by=(_played_on().desc(), Event.id.desc()),
+            ).label("position"),
+        )
+        .join(Event, EventParticipant.event_id == Event.id)
+        .where(EventParticipant.player_id.in_(player_ids), EventParticipant.outcome.in_(list(FORM_LETTERS)))
+        .subquery()
+    )
+    form = {player_id: "" for player_id in player_ids}
+    for row in session.execute(
+        select(ranked.c.player_id, ranked.c.outcome)
+        .where(ranked.c.position <= FORM_LENGTH)
+        .order_by(ranked.c.player_id, ranked.c.position)
+    ):
+        form[row.player_id] += FORM_LETTERS[row.outcome]
+    # Bulk UPDATE by primary key, one executemany
+    session.execute(update(PlayerStats), [{"player_id": player_id, "form": letters} for player_id, letters in form.items()])
+
+
+def rebuild(conn, batch_size=1000):
+    """Recomputes player_stats from the whole of event_participants.
+
+    History is read in id order, `batch_size` rows at a time, keeping only
+    the running totals and the latest results of each player in memory.
+    Returns the number of players written.
+    """
+    totals = {}
+    recent = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(EventParticipant.id, EventParticipant.player_id, EventParticipant.outcome, _played_on(), Event.id)
+            .join(Event, EventParticipant.event_id == Event.id)
+            .where(EventParticipant.id > last_id)
+            .order_by(EventParticipant.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        for _, player_id, outcome, played_on, event_id in rows:
+            add_deltas(totals, player_id, {"events_joined": 1, **outcome_deltas(outcome)})
+            if outcome in FORM_LETTERS:
+                results = recent.setdefault(player_id, [])
+                results.append((played_on, event_id, outcome))
+                if len(results) > FORM_LENGTH * 4:
+                    results[:] = sorted(results, reverse=True)[:FORM_LENGTH]
+
+    now = datetime.utcnow()
+    stats = [
+        {
+            "player_id": player_id,
+            **{counter: changes.get(counter, 0) for counter in COUNTERS},
+            "form": "".join(
+                FORM_LETTERS[outcome]
+                for _, _, outcome in sorted(recent.get(player_id, []), reverse=True)[:FORM_LENGTH]
+            ),
+            "updated_at": now,
+        }
+        for player_id, changes in totals.items()
+    ]
+    conn.execute(delete(PlayerStats))
+    for start in range(0, len(stats), batch_size):
+        conn.execute(insert(PlayerStats), stats[start:start + batch_size])
+    return len(stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Player statistics maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--config", default="config.json", help="database configuration file")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    engine = create_db_engine(config=load_config(args.config))
+    with engine.begin() as conn:
+        players = rebuild(conn, args.batch_size)
+    print(f"Rebuilt statistics of {players} player(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import math
+from collections import namedtuple
+
+from sqlalchemy.orm import selectinload
+
+from models import Question
+
+SurveyOption = namedtuple("SurveyOption", "id text points")
+SurveyQuestion = namedtuple("SurveyQuestion", "id text weight options")
+
+# Adaptive mode stops once the standard error of the estimated total score is
+# below this fraction of the score range, after at least MIN_QUESTIONS answers
+DEFAULT_TOLERANCE = 0.05
+MIN_QUESTIONS = 2
+# Prior spread of a player's answers around their overall level, on a 0..1 scale
+PRIOR_SD = 0.25
+
+
+class SurveyBank:
+    """The survey questions with option lookups, loaded once and shared by all registrations."""
+
+    def __init__(self, questions):
+        self.questions = sorted(questions, key=lambda question: question.id)
+        self.by_id = {question.id: question for question in self.questions}
+        self.options = {
+            option.id: (question, option) for question in self.questions for option in question.options
+        }
+        self.total_range = sum(_range(question) for question in self.questions)
+
+    def __len__(self):
+        return len(self.questions)
+
+
+def _low(question):
+    return min(option.points for option in question.options)
+
+
+def _spread(question):
+    return max(option.points for option in question.options) - _low(question)
+
+
+def _range(question):
+    """Span of weighted points the question can add to the total score."""
+    return question.weight * _spread(question) if question.options else 0
+
+
+def load_bank(session):
+    """Reads all questions and their options in two queries."""
+    questions = session.query(Question).options(selectinload(Question.options)).all()
+    return SurveyBank([
+        SurveyQuestion(
+            id=question.id,
+            text=question.question_text,
+            weight=question.question_weight or 1,
+            options=tuple(
+                SurveyOption(id=option.id, text=option.option_text, points=option.response_points)
+                for option in sorted(question.options, key=lambda option: option.id)
+            ),
+        )
+        for question in questions
+    ])
+
+
+def bank_from_json(data):
+    """Builds a bank from data/initial_data.json contents, numbering rows as a fresh database would."""
+    questions = []
+    option_id = 0
+    for question_id, q_data in enumerate(data["questions"], start=1):
+        options = []
+        for option_data in q_data["options"]:
+            option_id += 1
+            options.append(SurveyOption(id=option_id, text=option_data["option_text"], points=option_data["response_points"]))
+        questions.append(SurveyQuestion(id=question_id, text=q_data["question_text"], weight=q_data["question_weight"], options=tuple(options)))
+    return SurveyBank(questions)
+
+
+def full_score(bank, answers):
+    """Weighted points of the chosen options; answers maps question id to option id."""
+    return sum(bank.by_id[question_id].weight * bank.options[option_id][1].points for question_id, option_id in answers.items())
+
+
+def _fit_level(bank, answers):
+    """Fits one overall level to the answers; returns (level, answer variance, level variance)."""
+    weight_sum = 0.0
+    squared_weight_sum = 0.0
+    level_sum = 0.0
+    normalized = []
+    for question_id, option_id in answers.items():
+        question = bank.by_id[question_id]
+        spread = _spread(question)
+        if not spread:
+            continue
+        x = (bank.options[option_id][1].points - _low(question)) / spread
+        normalized.append(x)
+        weight_sum += question.weight
+        squared_weight_sum += question.weight ** 2
+        level_sum += question.weight * x
+
+    level = level_sum / weight_sum if weight_sum else 0.5
+    # Shrink the observed spread towards the prior while there are few answers
+    variance = (PRIOR_SD ** 2 + sum((x - level) ** 2 for x in normalized)) / (len(normalized) + 1)
+    level_variance = variance * squared_weight_sum / weight_sum ** 2 if weight_sum else PRIOR_SD ** 2
+    return level, variance, level_variance
+
+
+def estimate(bank, answers):
+    """Estimates the total score a player would get on the whole survey.
+
+    Each answer is normalized to 0..1 within its question's point spread and
+    treated as a noisy reading of one overall level. Unanswered questions are
+    filled in at that level. Returns (estimated score, standard error).
+    """
+    level, variance, level_variance = _fit_level(bank, answers)
+    remaining = [question for question in bank.questions if question.id not in answers and question.options]
+    remaining_range = sum(_range(question) for question in remaining)
+    score = full_score(bank, answers) + sum(
+        question.weight * (_low(question) + level * _spread(question)) for question in remaining
+    )
+    error = math.sqrt(
+        remaining_range ** 2 * level_variance + variance * sum(_range(question) ** 2 for question in remaining)
+    )
+    return score, error
+
+
+def _expected_error(bank, answers, question, level):
+    """Standard error of the estimate once `question` is answered as a player at `level` likely would."""
+    if not question.options:
+        return estimate(bank, answers)[1]
+    target = _low(question) + level * _spread(question)
+    option = min(question.options, key=lambda option: abs(option.points - target))
+    return estimate(bank, {**answers, question.id: option.id})[1]
+
+
+def next_question(bank, answers, adaptive=True, tolerance=DEFAULT_TOLERANCE):
+    """Picks the next question to ask, or None when the survey is complete.
+
+    The full survey goes through questions in id order. Adaptive mode asks
+    the question expected to narrow the score estimate the most, given the
+    level the answers so far point to, and stops as soon as the estimate is
+    precise enough.
+    """
+    remaining = [question for question in bank.questions if question.id not in answers]
+    if not remaining:
+        return None
+    if not adaptive:
+        return remaining[0]
+    if len(answers) >= MIN_QUESTIONS:
+        _, error = estimate(bank, answers)
+        if error <= tolerance * bank.total_range:
+            return None
+    level = _fit_level(bank, answers)[0]
+    return min(
+        remaining,
+        key=lambda question: (_expected_error(bank, answers, question, level), -_range(question), question.id),
+    )
+
+
+def rating(bank, answers):
+    """The skill level stored for a player: exact when every question was answered."""
+    if len(answers) == len(bank):
+        return full_score(bank, answers)
+    return round(estimate(bank, answers)[0])
@@ -0,0 +1,161 @@
+import time
+from collections import Counter, OrderedDict
+
+DEFAULT_USER_LIMITS = "register=0.05/2,callback=2/10,*=1/5"
+DEFAULT_CHAT_LIMITS = "*=10/40"
+
+
+def parse_limits(spec):
+    """Parses "command=rate/burst,..." into {command: (rate, burst)}; "*" is the fallback."""
+    limits = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        command, _, value = item.partition("=")
+        rate, _, burst = value.partition("/")
+        limits[command.strip().lstrip("/")] = (float(rate), float(burst or rate))
+    if "*" not in limits:
+        raise ValueError(f"Throttle limits need a '*' fallback: {spec!r}")
+    return limits
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by an arbitrary hashable, one small list per active key.
+
+    Buckets are kept in least-recently-used order, so idle ones are evicted
+    from the front in amortized O(1). An idle bucket refills completely after
+    burst / rate seconds, which makes evicting it after that long lossless.
+    """
+
+    def __init__(self, rate, burst, idle_ttl=None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.idle_ttl = max(idle_ttl or 0, burst / rate)
+        self.clock = clock
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def bucket(self, key):
+        """The key's bucket as [tokens, last refill], refilled up to now."""
+        now = self.clock()
+        self._evict(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def allow(self, key, cost=1.0):
+        """Takes `cost` tokens from the key's bucket; returns False when it is empty."""
+        bucket = self.bucket(key)
+        if bucket[0] < cost:
+            return False
+        bucket[0] -= cost
+        return True
+
+    def _evict(self, now):
+        buckets = self._buckets
+        while buckets:
+            key, (_, stamp) = next(iter(buckets.items()))
+            if now - stamp < self.idle_ttl:
+                break
+            del buckets[key]
+
+
+def classify_update(data):
+    """Returns (command, user_id, chat_id) from a raw update dict without building objects."""
+    message = data.get("message") or data.get("edited_message")
+    if message:
+        text = message.get("text") or ""
+        command = "message"
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0][1:].split("@", 1)[0]
+        return command, (message.get("from") or {}).get("id"), (message.get("chat") or {}).get("id")
+
+    query = data.get("callback_query")
+    if query:
+        chat = ((query.get("message") or {}).get("chat") or {}).get("id")
+        return "callback", (query.get("from") or {}).get("id"), chat
+
+    return None, None, None
+
+
+class UpdateThrottle:
+    """Drops updates from users or chats that exceed their per-command rate.
+
+    Buckets live in the worker process, so with N workers serving the
+    webhook a user or chat gets up to N times the configured rate. Dropped
+    update counts are summed across workers through publish().
+    """
+
+    def __init__(self, user_limits=DEFAULT_USER_LIMITS, chat_limits=DEFAULT_CHAT_LIMITS, clock=time.monotonic):
+        self.clock = clock
+        self.user_limits = parse_limits(user_limits) if isinstance(user_limits, str) else user_limits
+        self.chat_limits = parse_limits(chat_limits) if isinstance(chat_limits, str) else chat_limits
+        self.dropped = Counter()
+        self._published = Counter()
+        self._published_at = None
+        self._limiters = {}
+
+    def _limiter(self, scope, command):
+        limits = self.user_limits if scope == "user" else self.chat_limits
+        if command not in limits:
+            command = "*"
+        limiter = self._limiters.get((scope, command))
+        if limiter is None:
+            rate, burst = limits[command]
+            limiter = self._limiters[(scope, command)] = TokenBucketLimiter(rate, burst, clock=self.clock)
+        return limiter
+
+    def allow(self, data):
+        """Checks a raw update dict against the user and chat buckets."""
+        command, user_id, chat_id = classify_update(data)
+        if command is None:
+            return True
+        buckets = [
+            (scope, self._limiter(scope, command).bucket(key))
+            for scope, key in (("user", user_id), ("chat", chat_id))
+            if key is not None
+        ]
+        # Both buckets are checked before either is charged, so a dropped update costs nothing
+        for scope, bucket in buckets:
+            if bucket[0] < 1:
+                self.dropped[(scope, command)] += 1
+                return False
+        for _, bucket in buckets:
+            bucket[0] -= 1
+        return True
+
+    def publish(self, coordinator, interval=5.0):
+        """Adds the drops counted since the last publish to the coordinator's shared counters.
+
+        Runs at most every `interval` seconds, so a flood of dropped updates
+        costs one write per counter and interval rather than one per update.
+        """
+        now = self.clock()
+        if self._published_at is not None and now - self._published_at < interval:
+            return
+        self._published_at = now
+        for (scope, command), count in (self.dropped - self._published).items():
+            coordinator.incr(f"throttle:dropped:{scope}:{command}", count)
+        self._published = self.dropped.copy()
+
+    def stats(self, coordinator=None):
+        """Dropped update counters and the number of tracked keys per limiter.
+
+        With a coordinator, dropped counts are the published totals of every worker.
+        """
+        if coordinator is None:
+            dropped = {f"{scope}:{command}": count for (scope, command), count in self.dropped.items()}
+        else:
+            prefix = "throttle:dropped:"
+            dropped = {name[len(prefix):]: count for name, count in coordinator.counters(prefix).items()}
+        return {
+            "dropped": dropped,
+            "active_keys": {f"{scope}:{command}": len(limiter) for (scope, command), limiter in self._limiters.items()},
+        }